@@ -0,0 +1,14 @@
+import pytest
+
+from knowledge_commitment import VERIFICATION_BACKENDS, unpack_knowledge_commitment_data
+
+pytest.importorskip("coincurve")
+
+
+@pytest.mark.parametrize("backend", list(VERIFICATION_BACKENDS))
+def test_verify(benchmark, commitments, backend) -> None:
+    def verify_all() -> list:
+        return [unpack_knowledge_commitment_data(hotkey, data, backend) for hotkey, data in commitments]
+
+    addresses = benchmark(verify_all)
+    assert sum(address is not None for address in addresses) == len(commitments) // 3
@@ -0,0 +1,19 @@
+import random
+
+import pytest
+from ecdsa.curves import SECP256k1
+from ecdsa.keys import SigningKey
+
+from knowledge_commitment import create_knowledge_commitment_data
+
+
+@pytest.fixture(scope="session")
+def commitments() -> list[tuple[str, bytes]]:
+    """Commitments of deterministic keys: valid ones, copies with a corrupted signature and copies of other hotkeys."""
+    rng = random.Random(0)
+    items = []
+    for index in range(64):
+        hotkey = f"hotkey{index}"
+        data = create_knowledge_commitment_data(hotkey, SigningKey.from_secret_exponent(index + 1, curve=SECP256k1))
+        items += [(hotkey, data), (hotkey, data[:64] + rng.randbytes(64)), (f"other{index}", data)]
+    return items
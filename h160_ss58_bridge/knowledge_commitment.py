@@ -1,17 +1,49 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
 
+from bittensor.core.chain_data import decode_account_id
 from bittensor.core.extrinsics.serving import get_metadata, publish_metadata
 from ecdsa.curves import SECP256k1
 from ecdsa.errors import MalformedPointError
 from ecdsa.keys import BadSignatureError, SigningKey, VerifyingKey
 from eth_utils import keccak, to_checksum_address
 
+try:
+    import coincurve
+    from coincurve.ecdsa import cdata_to_der, deserialize_compact
+except ImportError:  # optional dependency, a much faster verification backend
+    coincurve = None
+
 if TYPE_CHECKING:
     import bittensor_wallet
     from bittensor import Subtensor
 
+PUBLIC_KEY_SIZE = 64
+SIGNATURE_SIZE = 64
+# below this many commitments, verifying them in the current process is faster than starting a process pool
+PROCESS_POOL_THRESHOLD = 32 if coincurve is None else 2048
+DEFAULT_VERIFICATION_CACHE_SIZE = 65536
+VERIFICATION_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS verified_commitments (
+    hotkey TEXT NOT NULL,
+    data_hash BLOB NOT NULL,
+    address TEXT,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (hotkey, data_hash)
+);
+CREATE INDEX IF NOT EXISTS verified_commitments_by_last_used ON verified_commitments (last_used);
+"""
+
 
 def create_knowledge_commitment_data(hotkey: str, private_key: SigningKey) -> bytes:
     public_key: bytes = private_key.get_verifying_key().to_string()
@@ -24,23 +56,119 @@ def ethereum_h160_address(data: bytes) -> bytes:
     return to_checksum_address(hashed[-20:])
 
 
-def unpack_knowledge_commitment_data(hotkey: str, data: bytes) -> str | None:
-    public_key_bytes: bytes = data[:64]
+def verify_with_ecdsa(public_key_bytes: bytes, signature: bytes, message: bytes) -> bool:
     try:
         public_key: VerifyingKey = VerifyingKey.from_string(public_key_bytes, curve=SECP256k1)
     except MalformedPointError:
-        return None
+        return False
 
-    signature: bytes = data[64:]
     try:
-        if not public_key.verify(signature, hotkey.encode()):
-            return None
+        return public_key.verify(signature, message)
     except BadSignatureError:
+        return False
+
+
+def verify_with_coincurve(public_key_bytes: bytes, signature: bytes, message: bytes) -> bool:
+    """Verify like `verify_with_ecdsa`, but with libsecp256k1."""
+    if len(public_key_bytes) != PUBLIC_KEY_SIZE or len(signature) != SIGNATURE_SIZE:
+        return False
+    r = int.from_bytes(signature[:32], 'big')
+    s = int.from_bytes(signature[32:], 'big')
+    if not (0 < r < SECP256k1.order and 0 < s < SECP256k1.order):
+        return False
+    # libsecp256k1 only accepts signatures with a low S, ecdsa accepts both equivalent forms
+    if s > SECP256k1.order // 2:
+        s = SECP256k1.order - s
+
+    try:
+        public_key = coincurve.PublicKey(b'\x04' + public_key_bytes)
+    except ValueError:
+        return False
+
+    compact_signature = r.to_bytes(32, 'big') + s.to_bytes(32, 'big')
+    # ecdsa signs SHA-1 digests by default, which it takes as a number just like a 32 byte left padded digest
+    digest = hashlib.sha1(message).digest().rjust(32, b'\0')
+    return public_key.verify(cdata_to_der(deserialize_compact(compact_signature)), digest, hasher=None)
+
+
+VERIFICATION_BACKENDS = {'ecdsa': verify_with_ecdsa}
+if coincurve is not None:
+    VERIFICATION_BACKENDS['coincurve'] = verify_with_coincurve
+DEFAULT_VERIFICATION_BACKEND = 'coincurve' if coincurve is not None else 'ecdsa'
+
+
+def unpack_knowledge_commitment_data(
+    hotkey: str, data: bytes, backend: str = DEFAULT_VERIFICATION_BACKEND
+) -> str | None:
+    public_key_bytes: bytes = data[:64]
+    signature: bytes = data[64:]
+    if not VERIFICATION_BACKENDS[backend](public_key_bytes, signature, hotkey.encode()):
         return None
 
     return ethereum_h160_address(public_key_bytes)
 
 
+class VerificationCache:
+    """Persistent cache of knowledge commitment verification results.
+
+    Results are keyed by hotkey and SHA-256 of the commitment data, so a commitment that did not change is
+    never verified again, while a changed one always is. Failed verifications are cached too. Only the
+    `max_size` most recently used results are kept.
+    """
+
+    def __init__(self, path: str | Path, max_size: int = DEFAULT_VERIFICATION_CACHE_SIZE):
+        self.max_size = max_size
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(VERIFICATION_CACHE_SCHEMA)
+
+    def __enter__(self) -> VerificationCache:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def get_many(self, commitments: dict[str, bytes]) -> dict[str, str | None]:
+        """Return cached results of `commitments`, commitment data by hotkey, for the hotkeys that have one."""
+        keys = [(hotkey, hashlib.sha256(data).digest()) for hotkey, data in commitments.items()]
+        results = {}
+        with self.connection:
+            for hotkey, data_hash in keys:
+                row = self.connection.execute(
+                    "SELECT address FROM verified_commitments WHERE hotkey = ? AND data_hash = ?",
+                    (hotkey, data_hash),
+                ).fetchone()
+                if row is not None:
+                    results[hotkey] = row[0]
+            self.connection.executemany(
+                "UPDATE verified_commitments SET last_used = ? WHERE hotkey = ? AND data_hash = ?",
+                [(time.time(), hotkey, data_hash) for hotkey, data_hash in keys if hotkey in results],
+            )
+        return results
+
+    def put_many(self, commitments: dict[str, bytes], results: dict[str, str | None]) -> None:
+        """Store verification `results` of `commitments`, both by hotkey, and evict the least recently used."""
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO verified_commitments (hotkey, data_hash, address, last_used)"
+                " VALUES (?, ?, ?, ?)",
+                [
+                    (hotkey, hashlib.sha256(commitments[hotkey]).digest(), address, now)
+                    for hotkey, address in results.items()
+                ],
+            )
+            (count,) = self.connection.execute("SELECT COUNT(*) FROM verified_commitments").fetchone()
+            if count > self.max_size:
+                self.connection.execute(
+                    "DELETE FROM verified_commitments WHERE rowid IN ("
+                    " SELECT rowid FROM verified_commitments ORDER BY last_used LIMIT ?)",
+                    (count - self.max_size,),
+                )
+
+
 def put_h160_address(
     wallet: bittensor_wallet.Wallet,
     subtensor: Subtensor,
@@ -82,13 +210,16 @@ def put_h160_address(
     )
 
 
-def get_h160_address(subtensor: Subtensor, netuid: int, hotkey: str) -> str | None:
+def get_h160_address(
+    subtensor: Subtensor, netuid: int, hotkey: str, cache: VerificationCache | None = None
+) -> str | None:
     """Get h160 address from knowledge commitment of a hotkey.
 
     Args:
         subtensor: subtensor
         netuid: subnet's netuid
         hotkey: hotkey to get h160 assosiated with
+        cache: cache of verification results, so that unchanged commitments are not verified again
     
     Returns:
         None if there is no association, data is corrupted or association verification fails
@@ -100,6 +231,15 @@ def get_h160_address(subtensor: Subtensor, netuid: int, hotkey: str) -> str | No
     metadata: dict = get_metadata(  # type: ignore
         subtensor, netuid, hotkey
     )
+    data = extract_knowledge_commitment_data(metadata)
+    if data is None:
+        return None
+
+    return verify_knowledge_commitments({hotkey: data}, cache=cache).get(hotkey)
+
+
+def extract_knowledge_commitment_data(metadata) -> bytes | None:
+    """Extract the raw knowledge commitment data from `Commitments.CommitmentOf` metadata, None if malformed."""
     try:
         # This structure is hardcoded in bittensor publish_metadata function, but corresponding get_metadata
         # function does not use it, so we need to extract the value manually.
@@ -111,10 +251,147 @@ def get_h160_address(subtensor: Subtensor, netuid: int, hotkey: str) -> str | No
         else:
             return None
 
-        data = bytes(field[data_type][0])
+        return bytes(field[data_type][0])
     except (TypeError, LookupError):
         return None
 
-    return unpack_knowledge_commitment_data(hotkey, data)
+
+def get_h160_addresses(
+    subtensor: Subtensor,
+    netuid: int,
+    hotkeys: Iterable[str] | None = None,
+    max_workers: int | None = None,
+    cache: VerificationCache | None = None,
+) -> dict[str, str]:
+    """Get h160 addresses from knowledge commitments of many hotkeys at once.
+
+    All commitments of the subnet are fetched with a single storage map query, and signatures are verified
+    in a process pool.
+
+    Args:
+        subtensor: subtensor
+        netuid: subnet's netuid
+        hotkeys: hotkeys to get h160 associated with, all hotkeys with a commitment if None
+        max_workers: maximum number of verifying processes, number of CPUs if None
+        cache: cache of verification results, so that unchanged commitments are not verified again
+
+    Returns:
+        dict mapping hotkeys to 0x prefixed h160 addresses; hotkeys without a valid association are omitted
+
+    Raises:
+        Subtensor API exceptions
+    """
+    wanted = set(hotkeys) if hotkeys is not None else None
+    commitments: dict[str, bytes] = {}
+    for key, metadata in subtensor.query_map(module='Commitments', name='CommitmentOf', params=[netuid]):
+        hotkey = decode_account_id(key[0])
+        if wanted is not None and hotkey not in wanted:
+            continue
+        data = extract_knowledge_commitment_data(getattr(metadata, 'value', metadata))
+        if data is not None:
+            commitments[hotkey] = data
+
+    return verify_knowledge_commitments(commitments, max_workers, cache)
+
+
+def verify_knowledge_commitments(
+    commitments: dict[str, bytes],
+    max_workers: int | None = None,
+    cache: VerificationCache | None = None,
+) -> dict[str, str]:
+    """Verify knowledge commitment data by hotkey, return h160 addresses of the valid ones by hotkey.
+
+    Signatures are verified with the default backend, in a process pool if there are many of them.
+    """
+    results = cache.get_many(commitments) if cache is not None else {}
+    hotkeys = [hotkey for hotkey in commitments if hotkey not in results]
+    datas = [commitments[hotkey] for hotkey in hotkeys]
+    if len(hotkeys) < PROCESS_POOL_THRESHOLD or max_workers == 1:
+        addresses = list(map(unpack_knowledge_commitment_data, hotkeys, datas))
+    else:
+        # forking a process that holds the subtensor connection could deadlock the workers
+        context = multiprocessing.get_context("forkserver")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            addresses = list(executor.map(unpack_knowledge_commitment_data, hotkeys, datas, chunksize=16))
+
+    verified = dict(zip(hotkeys, addresses))
+    if cache is not None and verified:
+        cache.put_many(commitments, verified)
+    results.update(verified)
+    return {hotkey: address for hotkey, address in results.items() if address is not None}
+
+
+class HotkeyIndex:
+    """Reverse index of a subnet's knowledge commitments: h160 address to hotkey and UID.
+
+    `refresh` fetches all commitments again, but only verifies the ones that changed since the previous
+    refresh. Saved indexes are JSON files mapping lowercase addresses to ``[hotkey, uid]``, so they can be
+    used without bittensor, e.g. by `scripts/filter_transactions.py --hotkey-index`.
+    """
+
+    def __init__(self, netuid: int, entries: dict[str, tuple[str, int]] | None = None):
+        self.netuid = netuid
+        self.entries: dict[str, tuple[str, int]] = entries or {}
+        self._cache: VerificationCache | None = None
+
+    def refresh(
+        self, subtensor: Subtensor, cache: VerificationCache | None = None, max_workers: int | None = None
+    ) -> None:
+        """Rebuild the index from the current commitments and registrations of the subnet.
+
+        Args:
+            subtensor: subtensor
+            cache: cache of verification results; an in-memory one kept by the index if None
+            max_workers: maximum number of verifying processes, number of CPUs if None
+
+        Raises:
+            Subtensor API exceptions
+        """
+        if cache is None:
+            if self._cache is None:
+                self._cache = VerificationCache(':memory:')
+            cache = self._cache
+        hotkeys = subtensor.metagraph(self.netuid, lite=True).hotkeys
+        addresses = get_h160_addresses(subtensor, self.netuid, hotkeys, max_workers=max_workers, cache=cache)
+        self.entries = {
+            addresses[hotkey].lower(): (hotkey, uid) for uid, hotkey in enumerate(hotkeys) if hotkey in addresses
+        }
+
+    def lookup(self, address: str) -> tuple[str, int] | None:
+        """Return the hotkey and UID associated with h160 `address`, None if there is none."""
+        return self.entries.get(address.lower())
+
+    def save(self, path: str | Path) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'netuid': self.netuid, 'entries': self.entries}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> HotkeyIndex:
+        with open(path) as f:
+            content = json.load(f)
+        return cls(content['netuid'], {address: tuple(entry) for address, entry in content['entries'].items()})
+
+
+def main() -> None:
+    from bittensor import Subtensor
+
+    parser = argparse.ArgumentParser(description="Build a reverse index of a subnet's h160 associations")
+    parser.add_argument("netuid", type=int, help="The subnet's netuid")
+    parser.add_argument("output", help="JSON file to write the index to")
+    parser.add_argument("--network", default="finney", help="Subtensor network or endpoint")
+    parser.add_argument("--cache", help="SQLite file with verification results of previous runs")
+    args = parser.parse_args()
+
+    index = HotkeyIndex(args.netuid)
+    cache = VerificationCache(args.cache) if args.cache else None
+    index.refresh(Subtensor(network=args.network), cache=cache)
+    if cache:
+        cache.close()
+    index.save(args.output)
+    print(f"Saved {len(index.entries)} associations of subnet {args.netuid} to {args.output}")
 
 
+if __name__ == '__main__':
+    main()
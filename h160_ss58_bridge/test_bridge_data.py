@@ -1,8 +1,20 @@
+from types import SimpleNamespace
+
+from bittensor.core.chain_data import decode_account_id
 from eth_account import Account
 from ecdsa.curves import SECP256k1
 from ecdsa.keys import SigningKey
+import pytest
 
-from knowledge_commitment import create_knowledge_commitment_data, unpack_knowledge_commitment_data
+import knowledge_commitment
+from knowledge_commitment import (
+    HotkeyIndex,
+    VerificationCache,
+    create_knowledge_commitment_data,
+    get_h160_addresses,
+    unpack_knowledge_commitment_data,
+    verify_knowledge_commitments,
+)
 
 
 def test_bridge_data() -> None:
@@ -14,3 +26,100 @@ def test_bridge_data() -> None:
     assert address == unpacked_address
 
 
+class FakeSubtensor:
+    def __init__(self, commitments: dict[bytes, bytes], hotkeys: list[str] | None = None):
+        self.commitments = commitments
+        self.hotkeys = hotkeys
+
+    def metagraph(self, netuid: int, lite: bool):
+        return SimpleNamespace(hotkeys=self.hotkeys)
+
+    def query_map(self, module: str, name: str, params: list):
+        assert (module, name) == ('Commitments', 'CommitmentOf')
+        for account_id, data in self.commitments.items():
+            metadata = {'info': {'fields': [({f'Raw{len(data)}': (tuple(data),)},)]}}
+            yield (tuple(account_id),), metadata
+
+
+def test_get_h160_addresses(monkeypatch) -> None:
+    # verify in a process pool
+    monkeypatch.setattr(knowledge_commitment, "PROCESS_POOL_THRESHOLD", 4)
+    accounts = [Account.create() for _ in range(8)]
+    account_ids = [bytes([index]) * 32 for index in range(len(accounts))]
+    hotkeys = [decode_account_id(account_id) for account_id in account_ids]
+    commitments = {
+        account_id: create_knowledge_commitment_data(hotkey, SigningKey.from_string(account.key, curve=SECP256k1))
+        for account_id, hotkey, account in zip(account_ids, hotkeys, accounts)
+    }
+    # a commitment signed for another hotkey is not a valid association
+    commitments[account_ids[0]] = commitments[account_ids[1]]
+    subtensor = FakeSubtensor(commitments)
+
+    addresses = get_h160_addresses(subtensor, 1, hotkeys[:-1])
+    assert addresses == {hotkey: account.address for hotkey, account in zip(hotkeys[1:-1], accounts[1:-1])}
+
+
+def test_verification_cache(tmp_path, monkeypatch) -> None:
+    account = Account.create()
+    signing_key = SigningKey.from_string(account.key, curve=SECP256k1)
+    commitments = {
+        f"hotkey{index}": create_knowledge_commitment_data(f"hotkey{index}", signing_key) for index in range(3)
+    }
+    commitments["invalid"] = commitments["hotkey0"]
+
+    with VerificationCache(tmp_path / "cache.sqlite", max_size=3) as cache:
+        assert verify_knowledge_commitments(commitments, cache=cache) == {
+            f"hotkey{index}": account.address for index in range(3)
+        }
+
+    verified = []
+    monkeypatch.setattr(
+        knowledge_commitment,
+        "unpack_knowledge_commitment_data",
+        lambda hotkey, data: verified.append(hotkey) or unpack_knowledge_commitment_data(hotkey, data),
+    )
+    with VerificationCache(tmp_path / "cache.sqlite", max_size=3) as cache:
+        # one of the four results was evicted
+        assert verify_knowledge_commitments(commitments, cache=cache) == {
+            f"hotkey{index}": account.address for index in range(3)
+        }
+        assert len(verified) == 1
+
+        # changed commitment data is verified again
+        del verified[:]
+        commitments["hotkey1"] = commitments["hotkey2"]
+        assert verify_knowledge_commitments(commitments, cache=cache) == {
+            "hotkey0": account.address, "hotkey2": account.address
+        }
+        assert "hotkey1" in verified
+
+
+def test_hotkey_index(tmp_path) -> None:
+    accounts = [Account.create() for _ in range(3)]
+    account_ids = [bytes([index]) * 32 for index in range(len(accounts))]
+    hotkeys = [decode_account_id(account_id) for account_id in account_ids]
+    commitments = {
+        account_id: create_knowledge_commitment_data(hotkey, SigningKey.from_string(account.key, curve=SECP256k1))
+        for account_id, hotkey, account in zip(account_ids, hotkeys, accounts)
+    }
+    # the first hotkey is no longer registered
+    subtensor = FakeSubtensor(commitments, hotkeys=hotkeys[1:])
+
+    index = HotkeyIndex(1)
+    index.refresh(subtensor)
+    index.save(tmp_path / "index.json")
+    index = HotkeyIndex.load(tmp_path / "index.json")
+
+    assert index.lookup(accounts[0].address) is None
+    assert index.lookup(accounts[1].address) == (hotkeys[1], 0)
+    assert index.lookup(accounts[2].address.lower()) == (hotkeys[2], 1)
+
+
+def test_verification_backends_agree(commitments) -> None:
+    pytest.importorskip("coincurve")
+    results = {
+        backend: [unpack_knowledge_commitment_data(hotkey, data, backend) for hotkey, data in commitments]
+        for backend in ("ecdsa", "coincurve")
+    }
+    assert results["ecdsa"] == results["coincurve"]
+    assert sum(address is not None for address in results["ecdsa"]) == len(commitments) // 3
@@ -0,0 +1,35 @@
+import pytest
+
+from filter_transactions import UNBOUNDED_SIGNATURE, iter_checkpoint_calls
+from scanner import DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY
+
+
+def scan(w3, contract, first_block, last_block, **kwargs) -> int:
+    calls = iter_checkpoint_calls(w3, contract.address, UNBOUNDED_SIGNATURE, first_block, last_block, **kwargs)
+    return sum(1 for _ in calls)
+
+
+@pytest.mark.parametrize(
+    "concurrency, batch_size",
+    [(1, None), (1, DEFAULT_BATCH_SIZE), (DEFAULT_CONCURRENCY, None), (DEFAULT_CONCURRENCY, DEFAULT_BATCH_SIZE)],
+    ids=["sequential", "batched", "concurrent", "concurrent-batched"],
+)
+def test_scan_blocks(benchmark, w3, seeded_checkpoint, concurrency, batch_size) -> None:
+    contracts, first_block, last_block = seeded_checkpoint
+    count = benchmark(
+        scan, w3, contracts["Checkpoint"], first_block, last_block, concurrency=concurrency, batch_size=batch_size
+    )
+    assert count > 0
+
+
+@pytest.mark.parametrize("processes", [2, 4])
+def test_scan_blocks_in_processes(benchmark, w3, seeded_checkpoint, processes) -> None:
+    contracts, first_block, last_block = seeded_checkpoint
+    count = benchmark(scan, w3, contracts["Checkpoint"], first_block, last_block, processes=processes)
+    assert count > 0
+
+
+def test_scan_logs(benchmark, w3, seeded_checkpoint) -> None:
+    contracts, first_block, last_block = seeded_checkpoint
+    count = benchmark(scan, w3, contracts["IndexedCheckpoint"], first_block, last_block, use_logs=True)
+    assert count > 0
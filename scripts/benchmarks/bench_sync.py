@@ -0,0 +1,64 @@
+import http.server
+import itertools
+import json
+import threading
+
+import pytest
+
+from map_cli import DEFAULT_MAX_GAS_PER_TRANSACTION, ConfigSyncer
+
+PARAMS = 200
+
+
+class ConfigHandler(http.server.BaseHTTPRequestHandler):
+    body = b""
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture(scope="module")
+def config_url():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ConfigHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/config.json"
+    server.shutdown()
+
+
+@pytest.fixture(scope="module")
+def map_contract(deploy, account):
+    return deploy("Map", account.address)
+
+
+revisions = itertools.count()
+
+
+def publish_config() -> None:
+    """Serve a config in which every param changed since the previous round."""
+    revision = next(revisions)
+    ConfigHandler.body = json.dumps({
+        f"param{index}": {"description": "", "items": [{"value": f"{revision}-{index}"}]}
+        for index in range(PARAMS)
+    }).encode()
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"concurrent": True}, {"max_gas_per_transaction": DEFAULT_MAX_GAS_PER_TRANSACTION}],
+    ids=["sequential", "concurrent", "batch"],
+)
+def test_sync(benchmark, w3, account, map_contract, config_url, options) -> None:
+    syncer = ConfigSyncer(w3, account, map_contract.address, **options)
+    benchmark.pedantic(
+        syncer.sync_config_from_urls,
+        args=([config_url],),
+        setup=publish_config,
+        rounds=3,
+    )
+    assert syncer.stats["failed"] == 0
@@ -0,0 +1,31 @@
+import pytest
+
+from common import TransactionSender, build_and_send_transaction, wait_for_receipt
+
+TRANSACTIONS = 50
+
+
+@pytest.fixture(scope="module")
+def checkpoint(deploy):
+    return deploy("Checkpoint")
+
+
+def send_sequentially(w3, account, contract) -> None:
+    for index in range(TRANSACTIONS):
+        function_call = contract.functions.checkpointUnbounded(index.to_bytes(32, "big"))
+        wait_for_receipt(w3, build_and_send_transaction(w3, contract, function_call, account, gas_limit=100000))
+
+
+def send_pipelined(w3, account, contract) -> None:
+    with TransactionSender(w3, account) as sender:
+        futures = [
+            sender.send(contract.functions.checkpointUnbounded(index.to_bytes(32, "big")))
+            for index in range(TRANSACTIONS)
+        ]
+        for future in futures:
+            future.result()
+
+
+@pytest.mark.parametrize("send", [send_sequentially, send_pipelined], ids=["sequential", "pipelined"])
+def test_write(benchmark, w3, account, checkpoint, send) -> None:
+    benchmark.pedantic(send, args=(w3, account, checkpoint), rounds=3)
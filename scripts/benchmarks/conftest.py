@@ -0,0 +1,109 @@
+import json
+import os
+import shutil
+import socket
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+from eth_account import Account
+from web3 import Web3
+
+from common import PooledHTTPProvider, RPCStats
+
+ARTIFACTS_DIR = Path(__file__).parent.parent.parent / "out"
+# first of the accounts anvil funds by default
+ANVIL_PRIVATE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+ANVIL_STARTUP_TIMEOUT = 30
+# number of checkpoint calls to seed the chain with, override with BENCHMARK_CALLS
+BENCHMARK_CALLS = int(os.getenv("BENCHMARK_CALLS", "2000"))
+CALLS_PER_BLOCK = 10
+
+
+def load_artifact(name: str) -> dict:
+    path = ARTIFACTS_DIR / f"{name}.sol" / f"{name}.json"
+    if not path.exists():
+        pytest.skip(f"{path} not found, run `forge build` first")
+    return json.loads(path.read_bytes())
+
+
+@pytest.fixture(scope="session")
+def rpc_url():
+    """URL of a fresh anvil node, running for the whole session."""
+    anvil = shutil.which("anvil")
+    if anvil is None:
+        pytest.skip("anvil not found, install the Foundry toolchain")
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    process = subprocess.Popen([anvil, "--port", str(port), "--silent"])
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + ANVIL_STARTUP_TIMEOUT
+        while not Web3(Web3.HTTPProvider(url)).is_connected():
+            if time.monotonic() > deadline or process.poll() is not None:
+                pytest.fail("anvil did not start")
+            time.sleep(0.1)
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@pytest.fixture(scope="session")
+def w3(rpc_url) -> Web3:
+    """Connection as made by `common.get_web3_connection`."""
+    return Web3(PooledHTTPProvider([rpc_url], RPCStats()))
+
+
+@pytest.fixture(scope="session")
+def account():
+    return Account.from_key(ANVIL_PRIVATE_KEY)
+
+
+@pytest.fixture(scope="session")
+def deploy(w3, account):
+    """Function deploying the contract `name` built by forge with constructor `args` and returning it."""
+
+    def deploy_contract(name: str, *args):
+        artifact = load_artifact(name)
+        factory = w3.eth.contract(abi=artifact["abi"], bytecode=artifact["bytecode"]["object"])
+        transaction = factory.constructor(*args).build_transaction({"from": account.address})
+        signed = account.sign_transaction({**transaction, "nonce": w3.eth.get_transaction_count(account.address)})
+        receipt = w3.eth.wait_for_transaction_receipt(w3.eth.send_raw_transaction(signed.raw_transaction))
+        return w3.eth.contract(address=receipt["contractAddress"], abi=artifact["abi"])
+
+    return deploy_contract
+
+
+@pytest.fixture(scope="session")
+def seeded_checkpoint(w3, account, deploy):
+    """Checkpoint and IndexedCheckpoint contracts with `BENCHMARK_CALLS` calls each, `CALLS_PER_BLOCK` per block.
+
+    Returns:
+        contracts by name, and the first and last block of the calls
+    """
+    contracts = {name: deploy(name) for name in ("Checkpoint", "IndexedCheckpoint")}
+    first_block = w3.eth.block_number + 1
+
+    nonce = w3.eth.get_transaction_count(account.address)
+    transaction = {"from": account.address, "gas": 200000, "gasPrice": w3.eth.gas_price, "chainId": w3.eth.chain_id}
+    w3.provider.make_request("evm_setAutomine", [False])
+    try:
+        for index in range(BENCHMARK_CALLS):
+            for contract in contracts.values():
+                payload = index.to_bytes(4, "big") * (1 + index % 16)
+                signed = account.sign_transaction(
+                    contract.functions.checkpointUnbounded(payload).build_transaction({**transaction, "nonce": nonce})
+                )
+                w3.eth.send_raw_transaction(signed.raw_transaction)
+                nonce += 1
+            if index % CALLS_PER_BLOCK == CALLS_PER_BLOCK - 1:
+                w3.provider.make_request("evm_mine", [])
+        w3.provider.make_request("evm_mine", [])
+    finally:
+        w3.provider.make_request("evm_setAutomine", [True])
+
+    return contracts, first_block, w3.eth.block_number
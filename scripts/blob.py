@@ -0,0 +1,115 @@
+import collections
+import hashlib
+import logging
+import struct
+from dataclasses import dataclass
+from typing import Iterator
+
+
+logger = logging.getLogger(__name__)
+
+
+BLOB_MAGIC = b'RBLB'
+BLOB_VERSION = 1
+# magic, version, blob id, chunk index, total number of chunks, sha256 of the whole blob
+CHUNK_HEADER = struct.Struct('>4sB16sII32s')
+MAX_PENDING_BLOBS = 64
+
+
+@dataclass(frozen=True, slots=True)
+class BlobChunk:
+    blob_id: bytes
+    index: int
+    total: int
+    blob_hash: bytes
+    data: bytes
+
+
+@dataclass(frozen=True, slots=True)
+class Blob:
+    """A reassembled and verified blob."""
+
+    sender: str
+    blob_id: bytes
+    block_number: int  # block of the chunk that completed the blob
+    data: bytes
+
+
+def split_blob(data: bytes, max_chunk_size: int) -> list[bytes]:
+    """Split `data` into chunk payloads of at most `max_chunk_size` bytes, headers included.
+
+    The blob id is derived from the content, so uploading the same data again produces identical chunks
+    and a partially uploaded blob can be completed by a later upload.
+    """
+    chunk_data_size = max_chunk_size - CHUNK_HEADER.size
+    if chunk_data_size < 1:
+        raise ValueError(f"chunk size must be larger than the {CHUNK_HEADER.size} byte header, got {max_chunk_size}")
+
+    blob_hash = hashlib.sha256(data).digest()
+    blob_id = blob_hash[:16]
+    total = max(1, -(-len(data) // chunk_data_size))
+    return [
+        CHUNK_HEADER.pack(BLOB_MAGIC, BLOB_VERSION, blob_id, index, total, blob_hash)
+        + data[index * chunk_data_size:(index + 1) * chunk_data_size]
+        for index in range(total)
+    ]
+
+
+def parse_chunk(payload: bytes) -> BlobChunk | None:
+    """Parse a chunk payload, `None` if `payload` is not a blob chunk."""
+    if len(payload) < CHUNK_HEADER.size or not payload.startswith(BLOB_MAGIC):
+        return None
+    _, version, blob_id, index, total, blob_hash = CHUNK_HEADER.unpack_from(payload)
+    if version != BLOB_VERSION or index >= total:
+        return None
+    return BlobChunk(blob_id, index, total, blob_hash, payload[CHUNK_HEADER.size:])
+
+
+class BlobAssembler:
+    """Reassembles blobs from checkpoint calls.
+
+    Chunks are grouped by sender and blob id, so nobody can inject chunks into another sender's blob.
+    Chunks may arrive in any order and duplicates are ignored. Only the `max_pending` most recently
+    started blobs are kept while incomplete; older ones are dropped.
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING_BLOBS):
+        self.max_pending = max_pending
+        self._pending: collections.OrderedDict[tuple[str, bytes], dict[int, BlobChunk]] = collections.OrderedDict()
+
+    def add(self, sender: str, block_number: int, payload: bytes) -> Blob | None:
+        """Add a checkpoint payload, return the blob it completes, if any."""
+        chunk = parse_chunk(payload)
+        if chunk is None:
+            return None
+
+        key = (sender, chunk.blob_id)
+        chunks = self._pending.get(key)
+        if chunks is None:
+            chunks = self._pending[key] = {}
+            if len(self._pending) > self.max_pending:
+                (dropped_sender, dropped_id), _ = self._pending.popitem(last=False)
+                logger.warning(f"Dropping incomplete blob {dropped_id.hex()} of {dropped_sender}")
+        chunks.setdefault(chunk.index, chunk)
+        if len(chunks) < chunk.total:
+            return None
+
+        del self._pending[key]
+        ordered_chunks = [chunks.get(index) for index in range(chunk.total)]
+        if None in ordered_chunks or any(
+            c.total != chunk.total or c.blob_hash != chunk.blob_hash for c in ordered_chunks
+        ):
+            logger.warning(f"Dropping blob {chunk.blob_id.hex()} of {sender}: inconsistent chunk headers")
+            return None
+        data = b''.join(c.data for c in ordered_chunks)
+        if hashlib.sha256(data).digest() != chunk.blob_hash:
+            logger.warning(f"Dropping blob {chunk.blob_id.hex()} of {sender}: hash mismatch")
+            return None
+        return Blob(sender, chunk.blob_id, block_number, data)
+
+    def assemble(self, calls) -> Iterator[Blob]:
+        """Yield the blobs completed by `calls`, checkpoint calls as yielded by `iter_checkpoint_calls`."""
+        for call in calls:
+            blob = self.add(call.sender, call.block_number, call.payload)
+            if blob is not None:
+                yield blob
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 
+import argparse
 import sys
+from codec import encode_payload
 from common import (
     load_contract_abi,
     get_web3_connection,
@@ -11,7 +13,7 @@ from common import (
 )
 
 
-def call_bounded(w3, account, contract_address, data: bytes):
+def call_bounded(w3, account, contract_address, data: bytes, compress=False):
     """Call `bounded` contract call.
 
     Args:
@@ -19,10 +21,12 @@ def call_bounded(w3, account, contract_address, data: bytes):
         account: Account to use for the transaction
         contract_address: Address of the contract
         data: data to put on the chain as contract call arguments 
+        compress: store the cheapest of the raw and compressed encodings of `data` that fits into 32 bytes
     Returns:
         receipt
     """
     validate_address_format(contract_address)
+    data = encode_payload(data, size=32) if compress else data.rjust(32, b'\0')
 
     contract_abi = load_contract_abi('../out/Checkpoint.sol/Checkpoint.json')
     contract = w3.eth.contract(address=contract_address, abi=contract_abi)
@@ -46,21 +50,21 @@ def call_bounded(w3, account, contract_address, data: bytes):
 
 def main():
     """Handle command line arguments and execute deposit."""
-    # Check command line arguments
-    if len(sys.argv) != 3:
-        print(
-            "Usage: python call_bounded.py <contract_address> "
-            "<hex data - max 32 byte string>",
-            file=sys.stderr
-        )
-        print(
-            "Example: python call_bounded.py 0x123... 0x45ab",
-            file=sys.stderr
-        )
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Store up to 32 bytes of data on the blockchain with checkpointBounded(bytes32)",
+        epilog="Example: python call_bounded.py 0x123... 0x45ab",
+    )
+    parser.add_argument("contract_address", help="The address of the deployed Checkpoint contract")
+    parser.add_argument("data", help="Hex data to store - max 32 byte string")
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Compress the data if that makes storing it cheaper; readers decompress it transparently",
+    )
+    args = parser.parse_args()
 
-    contract_address = sys.argv[1]
-    data = sys.argv[2]
+    contract_address = args.contract_address
+    data = args.data
     if data.startswith("0x"):
         data = data[2:]
 
@@ -71,7 +75,8 @@ def main():
         w3=w3,
         account=account,
         contract_address=contract_address,
-        data=bytes.fromhex(data.rjust(64, '0'))
+        data=bytes.fromhex(data.rjust(len(data) + len(data) % 2, '0')),
+        compress=args.compress,
     )
 
     print(f"Successfully stored data on the blockchain")
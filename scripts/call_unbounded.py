@@ -1,7 +1,13 @@
 #!/usr/bin/env python3
 
+import argparse
 import sys
+from blob import split_blob
+from codec import encode_payload
 from common import (
+    TX_BASE_GAS,
+    TransactionSender,
+    calldata_gas,
     load_contract_abi,
     get_web3_connection,
     get_account,
@@ -10,29 +16,55 @@ from common import (
     wait_for_receipt
 )
 
+# Gas used by the contract code itself, on top of the transaction base cost and calldata
+CHECKPOINT_EXECUTION_GAS = 30000
+DEFAULT_MAX_GAS_PER_TRANSACTION = 1000000
+# selector, offset word, length word and up to 31 bytes of padding around the payload
+CALL_ENCODING_OVERHEAD = 4 + 32 + 32 + 31
 
-def call_unbounded(w3, account, contract_address, data: bytes):
+
+def checkpoint_gas_limit(contract, data: bytes) -> int:
+    """Gas limit for a `checkpointUnbounded` call with `data`."""
+    calldata = bytes.fromhex(contract.encode_abi('checkpointUnbounded', args=[data])[2:])
+    return TX_BASE_GAS + calldata_gas(calldata) + CHECKPOINT_EXECUTION_GAS
+
+
+def max_chunk_size(max_gas_per_transaction: int) -> int:
+    """Largest chunk payload that is guaranteed to fit into `max_gas_per_transaction`."""
+    available_gas = max_gas_per_transaction - TX_BASE_GAS - CHECKPOINT_EXECUTION_GAS
+    return available_gas // 16 - CALL_ENCODING_OVERHEAD
+
+
+def get_checkpoint_contract(w3, contract_address):
+    validate_address_format(contract_address)
+
+    contract_abi = load_contract_abi('../out/Checkpoint.sol/Checkpoint.json')
+    return w3.eth.contract(address=contract_address, abi=contract_abi)
+
+
+def call_unbounded(w3, account, contract_address, data: bytes, compress=False):
     """Call `unbounded` contract call.
 
     Args:
         w3: Web3 instance
         account: Account to use for the transaction
         contract_address: Address of the contract
-        data: data to put on the chain as contract call arguments 
+        data: data to put on the chain as contract call arguments
+        compress: store the cheapest of the raw and compressed encodings of `data`
     Returns:
         receipt
     """
-    validate_address_format(contract_address)
-
-    contract_abi = load_contract_abi('../out/Checkpoint.sol/Checkpoint.json')
-    contract = w3.eth.contract(address=contract_address, abi=contract_abi)
+    contract = get_checkpoint_contract(w3, contract_address)
+    if compress:
+        data = encode_payload(data)
 
     try:
         tx_hash = build_and_send_transaction(
             w3,
             contract,
             contract.functions.checkpointUnbounded(data),
-            account
+            account,
+            gas_limit=checkpoint_gas_limit(contract, data),
         )
 
         receipt = wait_for_receipt(w3, tx_hash)
@@ -44,42 +76,120 @@ def call_unbounded(w3, account, contract_address, data: bytes):
         sys.exit(1)
 
 
+def call_unbounded_blob(
+    w3,
+    account,
+    contract_address,
+    data: bytes,
+    max_gas_per_transaction=DEFAULT_MAX_GAS_PER_TRANSACTION,
+    compress=False,
+):
+    """Store `data` of any size as a blob split into a series of `unbounded` contract calls.
+
+    Chunks are sent with locally assigned consecutive nonces while the receipts of earlier chunks are
+    still being awaited, see `TransactionSender`.
+    The blob can be reassembled with `filter_transactions.py --blob-dir`.
+
+    Args:
+        w3: Web3 instance
+        account: Account to use for the transactions
+        contract_address: Address of the contract
+        data: data to put on the chain
+        max_gas_per_transaction: gas budget of a single chunk transaction, determines the chunk size
+        compress: store the cheapest of the raw and compressed encodings of `data`
+    Returns:
+        receipts of all chunk transactions, in chunk order
+    """
+    contract = get_checkpoint_contract(w3, contract_address)
+    if compress:
+        data = encode_payload(data)
+
+    try:
+        chunks = split_blob(data, max_chunk_size(max_gas_per_transaction))
+        with TransactionSender(w3, account) as sender:
+            futures = [
+                sender.send(
+                    contract.functions.checkpointUnbounded(chunk),
+                    gas_limit=checkpoint_gas_limit(contract, chunk),
+                )
+                for chunk in chunks
+            ]
+            return [future.result() for future in futures]
+
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+
 def main():
     """Handle command line arguments and execute deposit."""
-    # Check command line arguments
-    if len(sys.argv) != 3:
-        print(
-            "Usage: python call_unbounded.py <contract_address> "
-            "<hex data>",
-            file=sys.stderr
-        )
-        print(
-            "Example: python call_unbounded.py 0x123... 0x456abc...",
-            file=sys.stderr
-        )
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Store data on the blockchain with checkpointUnbounded(bytes)",
+        epilog="Example: python call_unbounded.py 0x123... 0x456abc...",
+    )
+    parser.add_argument("contract_address", help="The address of the deployed Checkpoint contract")
+    parser.add_argument("data", nargs="?", help="Hex data to store")
+    parser.add_argument("--file", help="Store the contents of this file instead of hex data")
+    parser.add_argument(
+        "--blob",
+        action="store_true",
+        help="Split the data into chunks stored by a series of transactions",
+    )
+    parser.add_argument(
+        "--max-gas-per-transaction",
+        type=int,
+        default=DEFAULT_MAX_GAS_PER_TRANSACTION,
+        help="Gas budget of a single blob chunk transaction",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Compress the data if that makes storing it cheaper; readers decompress it transparently",
+    )
+    args = parser.parse_args()
+
+    if (args.data is None) == (args.file is None):
+        parser.error("exactly one of <hex data> and --file is required")
 
-    contract_address = sys.argv[1]
-    data = sys.argv[2]
-    if data.startswith("0x"):
-        data = data[2:]
+    if args.file:
+        with open(args.file, 'rb') as f:
+            data = f.read()
+    else:
+        data = args.data
+        if data.startswith("0x"):
+            data = data[2:]
+        data = bytes.fromhex(data)
 
     w3 = get_web3_connection()
     account = get_account()
 
-    receipt = call_unbounded(
-        w3=w3,
-        account=account,
-        contract_address=contract_address,
-        data=bytes.fromhex(data)
-    )
+    if args.blob:
+        receipts = call_unbounded_blob(
+            w3=w3,
+            account=account,
+            contract_address=args.contract_address,
+            data=data,
+            max_gas_per_transaction=args.max_gas_per_transaction,
+            compress=args.compress,
+        )
+    else:
+        receipts = [
+            call_unbounded(
+                w3=w3,
+                account=account,
+                contract_address=args.contract_address,
+                data=data,
+                compress=args.compress,
+            )
+        ]
 
     print(f"Successfully stored data on the blockchain")
     print("Details:")
     print(f"  Account: {account.address}")
-    print(f"  Transaction hash: {receipt['transactionHash'].hex()}")
-    print(f"  Block number: {receipt['blockNumber']}")
-    print(f"  Data: {data}")
+    for receipt in receipts:
+        print(f"  Transaction hash: {receipt['transactionHash'].hex()}")
+        print(f"  Block number: {receipt['blockNumber']}")
+    print(f"  Data: {data.hex() if len(data) <= 64 else f'{len(data)} bytes'}")
 
 
 if __name__ == "__main__":
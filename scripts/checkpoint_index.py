@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+from signatures import SIGNATURES_BY_KIND
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoint_calls (
+    tx_hash TEXT PRIMARY KEY,
+    block INTEGER NOT NULL,
+    tx_index INTEGER NOT NULL,
+    contract TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS checkpoint_calls_by_sender ON checkpoint_calls (sender, block, tx_index);
+CREATE INDEX IF NOT EXISTS checkpoint_calls_by_contract ON checkpoint_calls (contract, signature, block, tx_index);
+"""
+COLUMNS = "block, tx_index, tx_hash, contract, signature, sender, payload"
+
+
+class IndexedCall(NamedTuple):
+    block: int
+    tx_index: int
+    tx_hash: str
+    contract: str
+    signature: str
+    sender: str
+    payload: bytes
+
+
+class CheckpointIndex:
+    """Local SQLite index of decoded checkpoint calls.
+
+    Calls are keyed by transaction hash, so indexing the same blocks again (e.g. after a rewound scan) is harmless.
+    Addresses are stored checksummed.
+    """
+
+    def __init__(self, path: str | Path):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self) -> "CheckpointIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def add_calls(self, calls: Iterable[IndexedCall]) -> None:
+        """Insert or replace `calls` in a single transaction."""
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO checkpoint_calls ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                calls,
+            )
+
+    def remove_from_block(self, contract: str, signature: str, first_block: int) -> None:
+        """Remove calls of `contract` from `first_block` on, e.g. because the blocks were reorganized."""
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM checkpoint_calls WHERE contract = ? AND signature = ? AND block >= ?",
+                (contract, signature, first_block),
+            )
+
+    def _query(self, where: str = "", params: tuple = (), order: str = "block, tx_index") -> list[IndexedCall]:
+        cursor = self.connection.execute(
+            f"SELECT {COLUMNS} FROM checkpoint_calls {where} ORDER BY {order}", params
+        )
+        return [IndexedCall(*row) for row in cursor]
+
+    def calls_from(
+        self,
+        sender: str,
+        start_block: int | None = None,
+        end_block: int | None = None,
+        contract: str | None = None,
+    ) -> list[IndexedCall]:
+        """Return all calls made by `sender` in blocks ``[start_block, end_block]``, oldest first.
+
+        Args:
+            sender: H160 address of the caller
+            start_block: first block to include, unbounded if None
+            end_block: last block to include, unbounded if None
+            contract: only include calls to this contract, all contracts if None
+        """
+        conditions = ["sender = ?"]
+        params = [sender]
+        if start_block is not None:
+            conditions.append("block >= ?")
+            params.append(start_block)
+        if end_block is not None:
+            conditions.append("block <= ?")
+            params.append(end_block)
+        if contract is not None:
+            conditions.append("contract = ?")
+            params.append(contract)
+        return self._query(f"WHERE {' AND '.join(conditions)}", tuple(params))
+
+    def latest_per_sender(self, contract: str, signature: str) -> list[IndexedCall]:
+        """Return the most recent call to `contract`'s `signature` function of every sender."""
+        return self._query(
+            """
+            WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, ROW_NUMBER() OVER (
+                        PARTITION BY sender ORDER BY block DESC, tx_index DESC
+                    ) AS recency
+                    FROM checkpoint_calls
+                    WHERE contract = ? AND signature = ?
+                )
+                WHERE recency = 1
+            )
+            """,
+            (contract, signature),
+            order="sender",
+        )
+
+    def last_block(self, contract: str, signature: str) -> int | None:
+        """Return the newest block with an indexed call to `contract`'s `signature` function."""
+        (block,) = self.connection.execute(
+            "SELECT MAX(block) FROM checkpoint_calls WHERE contract = ? AND signature = ?", (contract, signature)
+        ).fetchone()
+        return block
+
+
+def write_calls(calls: list[IndexedCall]) -> None:
+    csv_writer = csv.writer(sys.stdout)
+    csv_writer.writerow(['block', 'tx_hash', 'contract', 'sender', 'argument'])
+    for call in calls:
+        csv_writer.writerow([call.block, call.tx_hash, call.contract, call.sender, call.payload.hex()])
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Query a local index of checkpoint calls")
+    parser.add_argument("index_file", help="SQLite file filled by filter_transactions.py --index")
+
+    subparsers = parser.add_subparsers(dest="command", help="Available commands")
+
+    latest_parser = subparsers.add_parser("latest", help="Latest payload of every sender")
+    latest_parser.add_argument("contract_address", help="The address of the Checkpoint contract")
+    latest_parser.add_argument("kind", choices=list(SIGNATURES_BY_KIND), help="Which checkpoint function to query")
+
+    sender_parser = subparsers.add_parser("sender", help="All payloads of a sender in a block range")
+    sender_parser.add_argument("sender", help="H160 address of the sender")
+    sender_parser.add_argument("--contract", help="Only include calls to this contract")
+    sender_parser.add_argument("--from-block", type=int, help="First block to include")
+    sender_parser.add_argument("--to-block", type=int, help="Last block to include")
+    return parser
+
+
+def main():
+    # imported here so that the index can be used without web3
+    from web3 import Web3
+
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if not args.command:
+        parser.print_help()
+        sys.exit(1)
+
+    with CheckpointIndex(args.index_file) as index:
+        if args.command == "latest":
+            signature = SIGNATURES_BY_KIND[args.kind]
+            calls = index.latest_per_sender(Web3.to_checksum_address(args.contract_address), signature)
+        elif args.command == "sender":
+            contract = Web3.to_checksum_address(args.contract) if args.contract else None
+            calls = index.calls_from(
+                Web3.to_checksum_address(args.sender), args.from_block, args.to_block, contract
+            )
+
+    write_calls(calls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import logging
+import zlib
+
+from common import calldata_gas
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+
+logger = logging.getLogger(__name__)
+
+
+# Encoded payloads start with the magic followed by one byte identifying the codec.
+# Payloads without the magic are raw data, as stored by writers that do not use this module.
+CODEC_MAGIC = b'\xc0\xde'
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+HEADER_SIZE = len(CODEC_MAGIC) + 1
+MAX_DECODED_SIZE = 64 * 1024 * 1024
+DECODE_ERRORS = (ValueError, zlib.error) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+
+def _compress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, level=9)
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=19).compress(data)
+    return data
+
+
+def _decompress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_RAW:
+        return data
+    if codec == CODEC_ZLIB:
+        decompressor = zlib.decompressobj()
+        decoded = decompressor.decompress(data, MAX_DECODED_SIZE)
+        if decompressor.unconsumed_tail or not decompressor.eof:
+            raise ValueError("invalid or too large zlib payload")
+        return decoded
+    if codec == CODEC_ZSTD and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompress(data, max_output_size=MAX_DECODED_SIZE)
+    raise ValueError(f"unsupported codec {codec}")
+
+
+def available_codecs() -> list[int]:
+    codecs = [CODEC_RAW, CODEC_ZLIB]
+    if zstandard is not None:
+        codecs.append(CODEC_ZSTD)
+    return codecs
+
+
+def encode_payload(data: bytes, size: int | None = None) -> bytes:
+    """Encode `data` for storing on chain, picking the encoding with the lowest calldata gas cost.
+
+    Candidates are the data as is and the data compressed with every available codec, each with a header.
+    Data that could be mistaken for an encoded payload is never stored as is.
+
+    Args:
+        data: data to encode
+        size: for fixed size arguments (`bytes32`), the argument size; encodings are left padded with
+            zeros to this size and encodings that do not fit are not considered
+    Returns:
+        encoded payload
+    Raises:
+        ValueError: if `size` is given and no encoding fits into it
+    """
+    candidates = [CODEC_MAGIC + bytes([codec]) + _compress(codec, data) for codec in available_codecs()]
+    if not data.lstrip(b'\0').startswith(CODEC_MAGIC):
+        candidates.append(data)
+
+    if size is not None:
+        candidates = [candidate.rjust(size, b'\0') for candidate in candidates if len(candidate) <= size]
+        if not candidates:
+            raise ValueError(f"{len(data)} bytes of data do not fit into {size} bytes")
+    return min(candidates, key=lambda candidate: (calldata_gas(candidate), len(candidate)))
+
+
+def decode_payload(payload: bytes, fixed_size: bool = False) -> bytes:
+    """Decode a payload produced by `encode_payload`.
+
+    Payloads that are not encoded, or that cannot be decoded, are returned unchanged.
+    `encode_payload` only wraps uncompressed data in a header if the data itself starts with the magic,
+    so other payloads with such a header, like data stored without this module, are returned unchanged too.
+    Raw data stored without this module that happens to be a valid compressed payload cannot be told apart;
+    read such data with `--raw`.
+
+    Args:
+        payload: payload as stored on chain
+        fixed_size: whether the payload is a fixed size argument (`bytes32`), left padded with zeros
+    """
+    encoded = payload.lstrip(b'\0') if fixed_size else payload
+    if len(encoded) < HEADER_SIZE or not encoded.startswith(CODEC_MAGIC):
+        return payload
+    codec = encoded[len(CODEC_MAGIC)]
+    try:
+        decoded = _decompress(codec, encoded[HEADER_SIZE:])
+    except DECODE_ERRORS as e:
+        logger.debug(f"Payload looks encoded but cannot be decoded, keeping it as is: {e!r}")
+        return payload
+    if codec == CODEC_RAW and not decoded.lstrip(b'\0').startswith(CODEC_MAGIC):
+        logger.debug("Payload has a raw codec header encode_payload would not have added, keeping it as is")
+        return payload
+    return decoded
@@ -1,17 +1,79 @@
+import atexit
+import bisect
+import collections
+import copy
 import json
 import logging
 import os
 import pathlib
+import random
+import re
 import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 
+import requests
+import urllib3
 from eth_account import Account
 from eth_account.signers.local import LocalAccount
 from web3 import Web3
+from web3._utils.batching import sort_batch_response_by_response_ids
+from web3.exceptions import TimeExhausted, TransactionNotFound
+from web3.providers.rpc.utils import check_if_retry_on_failure
 
 
 logger = logging.getLogger(__name__)
 
 
+TX_BASE_GAS = 21000
+CALLDATA_ZERO_BYTE_GAS = 4
+CALLDATA_NONZERO_BYTE_GAS = 16
+
+DEFAULT_MAX_IN_FLIGHT = 16
+DEFAULT_GAS_PRICE_TTL = 30.0
+DEFAULT_RECEIPT_TIMEOUT = 120.0
+DEFAULT_REBROADCASTS = 3
+# replacing a pending transaction requires a gas price at least 10% higher
+REBROADCAST_GAS_PRICE_FACTOR = 1.125
+
+# upper bounds of the RPC latency histogram buckets, in seconds
+RPC_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# pseudo method under which the HTTP round trips of batch requests are recorded
+RPC_BATCH_METHOD = "batch"
+
+DEFAULT_RPC_POOL_SIZE = 32
+DEFAULT_RPC_TIMEOUT = 30.0
+DEFAULT_RPC_RETRIES = 5
+DEFAULT_RPC_BACKOFF = 0.25
+DEFAULT_RPC_MAX_BACKOFF = 30.0
+# weight of the latest request in the moving average of an endpoint's latency
+RPC_LATENCY_SMOOTHING = 0.2
+RETRYABLE_HTTP_STATUSES = {429, 502, 503, 504}
+# a transaction is only sent again if it certainly did not reach the node, see `_was_rejected`
+NON_IDEMPOTENT_RPC_METHODS = {"eth_sendRawTransaction", "eth_sendTransaction"}
+# methods reading the state at a block, with the position of the block parameter
+STATE_RPC_METHODS = {
+    "eth_call": 1,
+    "eth_getBalance": 1,
+    "eth_getCode": 1,
+    "eth_getTransactionCount": 1,
+    "eth_getStorageAt": 2,
+}
+RECENT_BLOCK_TAGS = {"latest", "pending", "safe", "finalized"}
+# seconds after which an endpoint that failed to serve old state is asked for it again, it may have been lagging
+ARCHIVE_RECHECK_INTERVAL = 600.0
+# errors of nodes that pruned the state of old blocks
+MISSING_STATE_ERROR = re.compile(
+    r"missing trie node|header not found|state.*not available|pruned|historical state", re.IGNORECASE
+)
+
+
+class TransactionReplaced(Exception):
+    """Raised when the nonce of a sent transaction was used by a different transaction."""
+    pass
+
+
 def load_contract_abi(abi_filename: str):
     """Load the contract ABI from the artifacts file."""
     abi_path = pathlib.Path(__file__).parent.parent / "out" / abi_filename
@@ -28,20 +90,405 @@ def load_contract_abi(abi_filename: str):
         sys.exit(1)
 
 
-def get_web3_connection() -> Web3:
-    """Get Web3 connection from RPC_URL environment variable."""
-    rpc_url = os.getenv('RPC_URL')
-    if not rpc_url:
+class RPCMethodStats:
+    """Counters of a single RPC method, see `RPCStats`."""
+
+    def __init__(self):
+        self.calls = 0
+        self.batched_calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency_sum = 0.0
+        # one bucket per RPC_LATENCY_BUCKETS bound, and one for slower requests
+        self.latency_buckets = [0] * (len(RPC_LATENCY_BUCKETS) + 1)
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "batched_calls": self.batched_calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "latency_sum": self.latency_sum,
+            "latency_buckets": dict(zip([*map(str, RPC_LATENCY_BUCKETS), "+Inf"], self.latency_buckets)),
+        }
+
+
+class RPCStats:
+    """Thread-safe per-method statistics of the RPC requests made by a provider.
+
+    `calls` are HTTP round trips of single requests, their latency and size is recorded under the method name.
+    Batch requests are recorded as one call of the `RPC_BATCH_METHOD` pseudo method, and as `batched_calls`
+    of every method in the batch. `errors` count both failed HTTP requests and JSON-RPC error responses.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.methods: dict[str, RPCMethodStats] = collections.defaultdict(RPCMethodStats)
+
+    def record_call(
+        self, method: str, latency: float, bytes_sent: int, bytes_received: int, error: bool = False
+    ) -> None:
+        with self._lock:
+            stats = self.methods[method]
+            stats.calls += 1
+            stats.errors += error
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            stats.latency_sum += latency
+            stats.latency_buckets[bisect.bisect_left(RPC_LATENCY_BUCKETS, latency)] += 1
+
+    def record_batched_call(self, method: str, error: bool = False) -> None:
+        with self._lock:
+            stats = self.methods[method]
+            stats.batched_calls += 1
+            stats.errors += error
+
+    def record_error(self, method: str) -> None:
+        with self._lock:
+            self.methods[method].errors += 1
+
+    def record_retry(self, method: str) -> None:
+        with self._lock:
+            self.methods[method].retries += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.methods.clear()
+
+    def as_dict(self) -> dict[str, dict]:
+        with self._lock:
+            return {method: stats.as_dict() for method, stats in sorted(self.methods.items())}
+
+    def to_prometheus(self) -> str:
+        """Render the statistics in the Prometheus text exposition format."""
+        lines = []
+        counters = [
+            ("calls", "HTTP round trips"),
+            ("batched_calls", "requests sent as part of a batch"),
+            ("errors", "failed requests and error responses"),
+            ("retries", "retried requests"),
+            ("bytes_sent", "request bytes"),
+            ("bytes_received", "response bytes"),
+        ]
+        stats = self.as_dict()
+        for name, description in counters:
+            lines += [f"# HELP rpc_{name}_total RPC {description}", f"# TYPE rpc_{name}_total counter"]
+            lines += [f'rpc_{name}_total{{method="{method}"}} {values[name]}' for method, values in stats.items()]
+
+        lines += ["# HELP rpc_latency_seconds RPC HTTP round trip latency", "# TYPE rpc_latency_seconds histogram"]
+        for method, values in stats.items():
+            cumulative = 0
+            for bound, count in values["latency_buckets"].items():
+                cumulative += count
+                lines.append(f'rpc_latency_seconds_bucket{{method="{method}",le="{bound}"}} {cumulative}')
+            lines.append(f'rpc_latency_seconds_sum{{method="{method}"}} {values["latency_sum"]}')
+            lines.append(f'rpc_latency_seconds_count{{method="{method}"}} {values["calls"]}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str | pathlib.Path) -> None:
+        """Write the statistics to `path`, as JSON if it ends with `.json`, in Prometheus text format otherwise."""
+        if str(path).endswith(".json"):
+            content = json.dumps(self.as_dict(), indent=2)
+        else:
+            content = self.to_prometheus()
+        pathlib.Path(path).write_text(content)
+
+
+class InstrumentedHTTPProvider(Web3.HTTPProvider):
+    """HTTP provider recording every request it makes in `stats`.
+
+    The statistics are shared by copies of the provider, so they include the requests of `clone_web3` instances.
+
+    Retries are counted by reimplementing the retry loop of `HTTPProvider`, on top of its private session
+    manager, so web3 is pinned to 7.6 in requirements.txt.
+    """
+
+    def __init__(self, endpoint_uri: str, stats: "RPCStats", **kwargs):
+        super().__init__(endpoint_uri, **kwargs)
+        self.stats = stats
+
+    def _post(self, method: str, request_data: bytes) -> bytes:
+        retry = self.exception_retry_configuration
+        if retry is None or not check_if_retry_on_failure(method, retry.method_allowlist):
+            return self._request_session_manager.make_post_request(
+                self.endpoint_uri, request_data, **self.get_request_kwargs()
+            )
+        for attempt in range(retry.retries):
+            try:
+                return self._request_session_manager.make_post_request(
+                    self.endpoint_uri, request_data, **self.get_request_kwargs()
+                )
+            except tuple(retry.errors):
+                if attempt == retry.retries - 1:
+                    raise
+                self.stats.record_retry(method)
+                time.sleep(retry.backoff_factor * 2 ** attempt)
+
+    def _make_request(self, method, request_data: bytes) -> bytes:
+        started = time.perf_counter()
+        try:
+            raw_response = self._post(method, request_data)
+        except Exception:
+            self.stats.record_call(method, time.perf_counter() - started, len(request_data), 0, error=True)
+            raise
+        self.stats.record_call(method, time.perf_counter() - started, len(request_data), len(raw_response))
+        return raw_response
+
+    def make_request(self, method, params):
+        response = super().make_request(method, params)
+        if "error" in response:
+            self.stats.record_error(method)
+        return response
+
+    def make_raw_request(self, method, params) -> bytes:
+        """Like `make_request`, but return the response body without decoding or formatting it."""
+        return self._make_request(method, self.encode_rpc_request(method, params))
+
+    def make_raw_batch_request(self, batch_requests) -> bytes:
+        """Like `make_batch_request`, but return the response body without decoding or formatting it."""
+        for method, _ in batch_requests:
+            self.stats.record_batched_call(method)
+        return self._make_request(RPC_BATCH_METHOD, self.encode_batch_rpc_request(batch_requests))
+
+    def make_batch_request(self, batch_requests):
+        request_data = self.encode_batch_rpc_request(batch_requests)
+        raw_response = self._make_request(RPC_BATCH_METHOD, request_data)
+        responses = self.decode_rpc_response(raw_response)
+        if not isinstance(responses, list):
+            # the whole batch was rejected
+            self.stats.record_error(RPC_BATCH_METHOD)
+            return responses
+        for (method, _), response in zip(batch_requests, responses):
+            self.stats.record_batched_call(method, error="error" in response)
+        return sort_batch_response_by_response_ids(responses)
+
+
+class RetryableRPCError(Exception):
+    """Raised for responses of an overloaded or rate limiting endpoint."""
+
+    def __init__(self, message: str, status: int, retry_after: float | None = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _was_rejected(error: Exception) -> bool:
+    """Whether a failed request certainly did not reach the node: it could not connect, or was rate limited."""
+    if isinstance(error, RetryableRPCError):
+        return error.status == 429
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
+class EndpointHealth:
+    """Connection pool and health of a single RPC endpoint of a `PooledHTTPProvider`."""
+
+    def __init__(self, uri: str, pool_size: int):
+        self.uri = uri
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # moving average of the latency, None until the first successful request
+        self.latency: float | None = None
+        self.in_flight = 0
+        self.failures = 0
+        self.unavailable_until = 0.0
+        # set when a request for the state of an old block fails
+        self.pruned_until = 0.0
+
+    @property
+    def archive(self) -> bool:
+        """Whether the endpoint is assumed to serve the state of old blocks."""
+        return time.monotonic() >= self.pruned_until
+
+    def score(self) -> float:
+        """Expected time to serve one more request, lower is better; endpoints that were not used yet go first."""
+        return (self.latency or 0.0) * (self.in_flight + 1)
+
+
+def _parse_retry_after(response: requests.Response) -> float | None:
+    try:
+        return max(0.0, float(response.headers["Retry-After"]))
+    except (KeyError, ValueError):  # missing, or an HTTP date, which nodes do not use in practice
+        return None
+
+
+class PooledHTTPProvider(InstrumentedHTTPProvider):
+    """Instrumented HTTP provider spreading requests over several RPC endpoints, retrying transient failures.
+
+    Every endpoint has a keep-alive pool of up to `pool_size` connections. Each request goes to the available
+    endpoint with the lowest `EndpointHealth.score`, so slow endpoints get fewer requests, and concurrent requests
+    are spread over all endpoints. Failed requests (connection errors, timeouts, HTTP 429 and 5xx responses) make
+    the endpoint unavailable for a jittered, exponentially growing backoff, or for the time in the `Retry-After`
+    header, and are retried up to `retries` times on the best other endpoint, or on the same one after the
+    backoff. Transactions are only retried when they did not reach the endpoint (connection refused or timed out,
+    rate limited), as a gateway error does not tell whether the node received the transaction.
+
+    Endpoints failing to serve the state of an old block are marked as not `archive`, and such requests are
+    sent to the other endpoints for the next `ARCHIVE_RECHECK_INTERVAL` seconds.
+    """
+
+    def __init__(
+        self,
+        endpoint_uris: list[str],
+        stats: RPCStats,
+        pool_size: int = DEFAULT_RPC_POOL_SIZE,
+        timeout: float = DEFAULT_RPC_TIMEOUT,
+        retries: int = DEFAULT_RPC_RETRIES,
+        backoff: float = DEFAULT_RPC_BACKOFF,
+        max_backoff: float = DEFAULT_RPC_MAX_BACKOFF,
+    ):
+        if not endpoint_uris:
+            raise ValueError("at least one endpoint is required")
+        super().__init__(endpoint_uris[0], stats, exception_retry_configuration=None)
+        self.endpoints = [EndpointHealth(uri, pool_size) for uri in endpoint_uris]
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return f"RPC connection {', '.join(endpoint.uri for endpoint in self.endpoints)}"
+
+    def _choose_endpoint(self, needs_archive: bool) -> EndpointHealth:
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.archive or not needs_archive] or self.endpoints
+            now = time.monotonic()
+            available = [e for e in candidates if e.unavailable_until <= now]
+            if available:
+                endpoint = min(available, key=EndpointHealth.score)
+            else:
+                endpoint = min(candidates, key=lambda e: e.unavailable_until)
+            endpoint.in_flight += 1
+            return endpoint
+
+    def _succeeded(self, endpoint: EndpointHealth, latency: float) -> None:
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.failures = 0
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += RPC_LATENCY_SMOOTHING * (latency - endpoint.latency)
+
+    def _failed(self, endpoint: EndpointHealth, retry_after: float | None = None) -> float:
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.failures += 1
+            if retry_after is None:
+                retry_after = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (endpoint.failures - 1)))
+            endpoint.unavailable_until = max(endpoint.unavailable_until, time.monotonic() + retry_after)
+            return retry_after
+
+    @staticmethod
+    def _needs_archive(method: str, request_data: bytes) -> bool:
+        if method not in STATE_RPC_METHODS:
+            return False
+        params = json.loads(request_data).get("params") or []
+        position = STATE_RPC_METHODS[method]
+        return len(params) > position and params[position] not in RECENT_BLOCK_TAGS
+
+    def _send(self, endpoint: EndpointHealth, method: str, request_data: bytes) -> bytes:
+        wait = endpoint.unavailable_until - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        kwargs = dict(self.get_request_kwargs())
+        kwargs.setdefault("timeout", self.timeout)
+        response = endpoint.session.post(endpoint.uri, data=request_data, **kwargs)
+        if response.status_code in RETRYABLE_HTTP_STATUSES:
+            raise RetryableRPCError(
+                f"{endpoint.uri} responded with HTTP {response.status_code}",
+                response.status_code,
+                _parse_retry_after(response),
+            )
+        response.raise_for_status()
+        return response.content
+
+    def _post(self, method: str, request_data: bytes) -> bytes:
+        needs_archive = self._needs_archive(method, request_data)
+        for attempt in range(self.retries + 1):
+            endpoint = self._choose_endpoint(needs_archive)
+            started = time.monotonic()
+            try:
+                raw_response = self._send(endpoint, method, request_data)
+            except (requests.ConnectionError, requests.Timeout, RetryableRPCError) as e:
+                delay = self._failed(endpoint, getattr(e, "retry_after", None))
+                if attempt == self.retries or (method in NON_IDEMPOTENT_RPC_METHODS and not _was_rejected(e)):
+                    raise
+                logger.debug(f"{method} request to {endpoint.uri} failed, backing off for {delay:.2f}s: {e!r}")
+                self.stats.record_retry(method)
+                continue
+            except Exception:
+                self._failed(endpoint)
+                raise
+            self._succeeded(endpoint, time.monotonic() - started)
+
+            if needs_archive and endpoint.archive:
+                error = json.loads(raw_response).get("error") or {}
+                if MISSING_STATE_ERROR.search(str(error.get("message", ""))):
+                    logger.info(f"{endpoint.uri} does not have the state of old blocks, not using it for them for now")
+                    with self._lock:
+                        endpoint.pruned_until = time.monotonic() + ARCHIVE_RECHECK_INTERVAL
+                    if any(e.archive for e in self.endpoints) and attempt < self.retries:
+                        self.stats.record_retry(method)
+                        continue
+            return raw_response
+
+
+# statistics of the connections made by `get_web3_connection`
+rpc_stats = RPCStats()
+_rpc_stats_dump_registered = False
+
+
+def _register_rpc_stats_dump() -> None:
+    """Write `rpc_stats` to the file in the RPC_STATS environment variable at exit, if set."""
+    global _rpc_stats_dump_registered
+    path = os.getenv('RPC_STATS')
+    if path and not _rpc_stats_dump_registered:
+        atexit.register(rpc_stats.dump, path)
+        _rpc_stats_dump_registered = True
+
+
+def get_web3_connection(default_rpc_url: str | None = None) -> Web3:
+    """Get Web3 connection from RPC_URL environment variable, falling back to `default_rpc_url` if given.
+
+    RPC_URL may be a comma separated list of endpoints, requests are then spread over all of them,
+    see `PooledHTTPProvider`.
+
+    Requests of the connection are recorded in `rpc_stats`, which are written to the file in the RPC_STATS
+    environment variable at exit (JSON if it ends with `.json`, Prometheus text format otherwise).
+    """
+    rpc_url = os.getenv('RPC_URL', default_rpc_url)
+    rpc_urls = [url.strip() for url in (rpc_url or "").split(',') if url.strip()]
+    if not rpc_urls:
         print("Error: RPC_URL environment variable is not set", file=sys.stderr)
         sys.exit(1)
 
-    w3 = Web3(Web3.HTTPProvider(rpc_url))
+    _register_rpc_stats_dump()
+    w3 = Web3(PooledHTTPProvider(rpc_urls, rpc_stats))
     if not w3.is_connected():
         print("Error: Failed to connect to the network", file=sys.stderr)
         sys.exit(1)
     return w3
 
 
+def clone_web3(w3: Web3) -> Web3:
+    """Create a Web3 instance talking to the same node as `w3`, with the same middleware.
+
+    web3 keeps the batching state on the provider, so threads that send batch requests
+    concurrently must not share one provider.
+    """
+    return Web3(copy.copy(w3.provider), middleware=w3.middleware_onion.middleware)
+
+
 def get_account() -> LocalAccount:
     """Get account from PRIVATE_KEY environment variable."""
     private_key = os.getenv('PRIVATE_KEY')
@@ -58,7 +505,13 @@ def validate_address_format(address):
         sys.exit(1)
 
 
-def build_and_send_transaction(w3, contract, function_call, account, gas_limit=100000, value=0):
+def calldata_gas(data: bytes) -> int:
+    """Return the gas charged for `data` sent as transaction input."""
+    zero_bytes = data.count(0)
+    return zero_bytes * CALLDATA_ZERO_BYTE_GAS + (len(data) - zero_bytes) * CALLDATA_NONZERO_BYTE_GAS
+
+
+def build_and_send_transaction(w3, contract, function_call, account, gas_limit=100000, value=0, nonce=None):
     """Build, sign and send a transaction.
 
     Args:
@@ -68,10 +521,14 @@ def build_and_send_transaction(w3, contract, function_call, account, gas_limit=1
         account: Account to send transaction from
         gas_limit: Maximum gas to use for the transaction
         value: Amount of ETH to send with the transaction (in Wei)
+        nonce: Nonce to use, fetched from the node if None; pass consecutive nonces to send
+            several transactions without waiting for each of them to be mined
     """
+    if nonce is None:
+        nonce = w3.eth.get_transaction_count(account.address)
     transaction = function_call.build_transaction({
         'from': account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
+        'nonce': nonce,
         'gas': gas_limit,
         'gasPrice': w3.eth.gas_price,
         'chainId': w3.eth.chain_id,
@@ -80,10 +537,148 @@ def build_and_send_transaction(w3, contract, function_call, account, gas_limit=1
 
     signed_txn = w3.eth.account.sign_transaction(transaction, account.key)
     tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-    logger.debug(f"Transaction sent: {tx_hash.hex()}", file=sys.stderr)
+    logger.debug(f"Transaction sent: {tx_hash.hex()}")
     return tx_hash
 
 
 def wait_for_receipt(w3, tx_hash):
     """Wait for transaction receipt and return it."""
     return w3.eth.wait_for_transaction_receipt(tx_hash)
+
+
+class TransactionSender:
+    """Sends transactions of a single account without waiting for each of them to be mined.
+
+    The chain id is fetched once, nonces are assigned locally and the gas price is refreshed at most
+    every `gas_price_ttl` seconds, so sending a transaction costs a single RPC call. Up to
+    `max_in_flight` transactions may be waiting for their receipts, which are collected in background
+    threads; `send` blocks while the window is full.
+
+    A transaction that is not mined within `receipt_timeout` seconds is broadcast again with a higher
+    gas price, at most `rebroadcasts` times. If its nonce gets used by another transaction, its future
+    fails with `TransactionReplaced`.
+
+    The account must not send other transactions while the sender is in use.
+    """
+
+    def __init__(
+        self,
+        w3: Web3,
+        account: LocalAccount,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        gas_price_ttl: float = DEFAULT_GAS_PRICE_TTL,
+        receipt_timeout: float = DEFAULT_RECEIPT_TIMEOUT,
+        rebroadcasts: int = DEFAULT_REBROADCASTS,
+    ):
+        self.w3 = w3
+        self.account = account
+        self.gas_price_ttl = gas_price_ttl
+        self.receipt_timeout = receipt_timeout
+        self.rebroadcasts = rebroadcasts
+        self.chain_id = w3.eth.chain_id
+        self._lock = threading.Lock()
+        self._nonce = w3.eth.get_transaction_count(account.address, 'pending')
+        self._gas_price = None
+        self._gas_price_fetched_at = 0.0
+        self._window = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+
+    def __enter__(self) -> "TransactionSender":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Wait for all receipts."""
+        self._executor.shutdown(wait=True)
+
+    @property
+    def gas_price(self) -> int:
+        now = time.monotonic()
+        if self._gas_price is None or now - self._gas_price_fetched_at > self.gas_price_ttl:
+            self._gas_price = self.w3.eth.gas_price
+            self._gas_price_fetched_at = now
+        return self._gas_price
+
+    def _sign_and_send(self, transaction: dict) -> bytes:
+        signed_txn = self.w3.eth.account.sign_transaction(transaction, self.account.key)
+        tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+        logger.debug(f"Transaction sent: {tx_hash.hex()} (nonce {transaction['nonce']})")
+        return tx_hash
+
+    def send(self, function_call, gas_limit=100000, value=0) -> Future:
+        """Sign and send a contract function call.
+
+        Args:
+            function_call: Contract function call to execute
+            gas_limit: Maximum gas to use for the transaction
+            value: Amount of ETH to send with the transaction (in Wei)
+        Returns:
+            future resolving to the transaction receipt
+        """
+        self._window.acquire()
+        try:
+            with self._lock:
+                transaction = function_call.build_transaction({
+                    'from': self.account.address,
+                    'nonce': self._nonce,
+                    'gas': gas_limit,
+                    'gasPrice': self.gas_price,
+                    'chainId': self.chain_id,
+                    'value': value
+                })
+                tx_hash = self._sign_and_send(transaction)
+                self._nonce += 1
+        except BaseException:
+            self._window.release()
+            raise
+
+        future = self._executor.submit(self._wait_for_receipt, transaction, tx_hash)
+        future.add_done_callback(lambda _: self._window.release())
+        return future
+
+    def _find_receipt(self, tx_hashes: list[bytes]):
+        for tx_hash in tx_hashes:
+            try:
+                return self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+        return None
+
+    def _wait_for_receipt(self, transaction: dict, tx_hash: bytes):
+        tx_hashes = [tx_hash]
+        for attempt in range(self.rebroadcasts + 1):
+            try:
+                return self.w3.eth.wait_for_transaction_receipt(tx_hashes[-1], timeout=self.receipt_timeout)
+            except TimeExhausted:
+                pass
+
+            # an earlier broadcast of the transaction may have been mined in the meantime
+            receipt = self._find_receipt(tx_hashes)
+            if receipt is not None:
+                return receipt
+            if self.w3.eth.get_transaction_count(self.account.address) > transaction['nonce']:
+                # the nonce may have been used by one of the broadcasts, mined since they were looked for
+                receipt = self._find_receipt(tx_hashes)
+                if receipt is not None:
+                    return receipt
+                raise TransactionReplaced(
+                    f"Nonce {transaction['nonce']} of {tx_hash.hex()} was used by another transaction"
+                )
+            if attempt == self.rebroadcasts:
+                break
+
+            # the transaction is stuck or was dropped from the mempool: broadcast it again, paying more
+            transaction = {
+                **transaction,
+                'gasPrice': max(self.gas_price, int(transaction['gasPrice'] * REBROADCAST_GAS_PRICE_FACTOR) + 1),
+            }
+            logger.warning(f"Transaction {tx_hashes[-1].hex()} not mined, rebroadcasting it")
+            try:
+                tx_hashes.append(self._sign_and_send(transaction))
+            except Exception as e:
+                # e.g. "nonce too low" if the previous broadcast was mined just now
+                logger.warning(f"Failed to rebroadcast transaction {tx_hashes[-1].hex()}: {e!r}")
+
+        raise TimeExhausted(f"Transaction {tx_hash.hex()} was not mined after {self.rebroadcasts} rebroadcasts")
@@ -0,0 +1,37 @@
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+from hexbytes import HexBytes
+from web3.exceptions import BlockNotFound
+
+
+class FakeChain:
+    """Web3 stand-in for a chain of empty blocks ``[0, head]``, whose blocks can be reorganized."""
+
+    def __init__(self, head: int):
+        self.forks = {number: 0 for number in range(head + 1)}
+        self.eth = SimpleNamespace(get_block=self.get_block, get_logs=lambda params: [])
+
+    def reorganize(self, first_block: int, head: int | None = None) -> None:
+        """Replace the blocks from `first_block` on by new ones, up to the new `head`."""
+        head = max(self.forks) if head is None else head
+        self.forks = {
+            number: self.forks.get(number, -1) + (number >= first_block) for number in range(head + 1)
+        }
+
+    def get_block(self, number: int, full_transactions: bool = False) -> SimpleNamespace:
+        if number not in self.forks:
+            raise BlockNotFound(f"Block {number} not found")
+        block_hash = HexBytes(bytes([self.forks[number]]) + number.to_bytes(31, 'big'))
+        return SimpleNamespace(number=number, hash=block_hash, transactions=[])
+
+    @contextlib.contextmanager
+    def batch_requests(self):
+        requests = []
+        yield SimpleNamespace(add=requests.append, execute=lambda: requests)
+
+
+@pytest.fixture
+def chain() -> FakeChain:
+    return FakeChain(head=200)
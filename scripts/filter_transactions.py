@@ -1,53 +1,621 @@
+import argparse
+import collections
 import csv
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Iterable, Iterator
+
 from web3 import Web3
-import sys
 
+from blob import BlobAssembler
+from checkpoint_index import CheckpointIndex, IndexedCall
+import codec
+from common import get_web3_connection
+from scanner import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_CONCURRENCY,
+    ScanCursor,
+    fetch_raw_blocks,
+    iter_blocks,
+    iter_chunks,
+    iter_logs,
+)
+from signatures import BOUNDED_SIGNATURE, SIGNATURES_BY_KIND, UNBOUNDED_SIGNATURE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RPC_URL = 'https://evm-testnet.dev.opentensor.ai'
 NUMBER_OF_RECENT_BLOCKS_TO_CHECK = 256
+INDEX_BATCH_SIZE = 1000
 OUTPUT_FILE = 'transactions.csv'
-BOUNDED_SIGNATURE = 'checkpointBounded(bytes32)'
-UNBOUNDED_SIGNATURE = 'checkpointUnbounded(bytes)'
-BYTES_TO_SKIP = {
-    BOUNDED_SIGNATURE: 10, # Skip function selector (10 characters)
-    UNBOUNDED_SIGNATURE: 138 # Skip function selector + encoded length + encoded offset
+SELECTOR_SIZE = 4
+WORD_SIZE = 32
+# Event emitted by IndexedCheckpoint.sol on every checkpoint call
+CHECKPOINTED_EVENT_TOPIC = Web3.keccak(text='Checkpointed(address,bytes4,bytes32)').to_0x_hex()
+
+
+@dataclass(frozen=True, slots=True)
+class CheckpointCall:
+    """A single call of a checkpoint function."""
+
+    block_number: int
+    tx_index: int
+    tx_hash: bytes
+    sender: str
+    payload: bytes
+
+
+def decode_bounded_payload(call_input: bytes) -> bytes | None:
+    """Return the `bytes32` argument of a `checkpointBounded` call input, `None` if the input is too short."""
+    if len(call_input) < SELECTOR_SIZE + WORD_SIZE:
+        return None
+    return bytes(call_input[SELECTOR_SIZE:SELECTOR_SIZE + WORD_SIZE])
+
+
+def decode_unbounded_payload(call_input: bytes) -> bytes | None:
+    """Return the exact `bytes` argument of a `checkpointUnbounded` call input, `None` if the input is malformed.
+
+    The offset and length words are read directly from the input, so any valid ABI encoding is accepted,
+    not only the canonical one, and the payload comes back without its zero padding.
+    """
+    arguments = memoryview(call_input)[SELECTOR_SIZE:]
+    if len(arguments) < WORD_SIZE:
+        return None
+    offset = int.from_bytes(arguments[:WORD_SIZE], 'big')
+    if offset > len(arguments) - WORD_SIZE:
+        return None
+    payload_start = offset + WORD_SIZE
+    length = int.from_bytes(arguments[offset:payload_start], 'big')
+    if length > len(arguments) - payload_start:
+        return None
+    return bytes(arguments[payload_start:payload_start + length])
+
+
+PAYLOAD_DECODERS = {
+    BOUNDED_SIGNATURE: decode_bounded_payload,
+    UNBOUNDED_SIGNATURE: decode_unbounded_payload,
 }
 
 
-w3 = Web3(Web3.HTTPProvider('https://evm-testnet.dev.opentensor.ai'))
+def decode_payloads(signature: str, call_inputs: Iterable[bytes]) -> list[bytes | None]:
+    """Decode the payloads of a batch of `signature` call inputs; malformed inputs decode to `None`."""
+    decoder = PAYLOAD_DECODERS[signature]
+    return [decoder(call_input) for call_input in call_inputs]
+
+
+@dataclass(frozen=True, slots=True)
+class ScanTarget:
+    """A checkpoint function of a contract whose calls are looked for."""
+
+    contract_address: str
+    signature: str
+
+    @property
+    def selector(self) -> bytes:
+        return Web3.keccak(text=self.signature)[:SELECTOR_SIZE]
+
+
+def iter_target_calls(
+    w3: Web3,
+    targets: Iterable[ScanTarget],
+    start: int,
+    end: int,
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    batch_size: int | None = DEFAULT_BATCH_SIZE,
+    cursor: ScanCursor | None = None,
+    decode: bool = True,
+    processes: int | None = None,
+) -> Iterator[tuple[ScanTarget, CheckpointCall]]:
+    """Yield calls of any of `targets` in blocks ``[start, end]``, in chain order, with the target they called.
+
+    Every block is downloaded once, and every transaction is matched with a single lookup of its recipient and
+    selector, so tracking more targets does not make the scan slower.
+    With `processes`, the raw responses of the node are filtered and decoded by that many worker processes
+    instead of being formatted by web3 in this one, see `filter_raw_blocks`.
+    The other arguments are the same as for `iter_checkpoint_calls`.
+    """
+    targets_by_call = {}
+    for target in targets:
+        assert target.signature in PAYLOAD_DECODERS, f"Invalid signature: {target.signature}"
+        targets_by_call[(Web3.to_checksum_address(target.contract_address), target.selector)] = target
+
+    if processes:
+        yield from _iter_target_calls_in_processes(
+            w3, targets_by_call, start, end, concurrency, chunk_size, batch_size, cursor, decode, processes
+        )
+        return
+
+    # blocks are fetched concurrently but arrive in order
+    for block in iter_blocks(w3, start, end, concurrency, chunk_size, batch_size):
+        for tx in block.transactions:
+            target = targets_by_call.get((tx['to'], tx['input'][:SELECTOR_SIZE]))
+            if target is None:
+                continue
+            call = _decode_call(
+                target, tx['input'], block.number, tx['transactionIndex'], tx['hash'], tx['from'], decode
+            )
+            if call is not None:
+                yield target, call
+
+        if cursor:
+            cursor.advance(block)
+
+
+def _decode_call(target, call_input, block_number, tx_index, tx_hash, sender, decode) -> CheckpointCall | None:
+    payload = PAYLOAD_DECODERS[target.signature](call_input)
+    if payload is None:
+        logger.warning(f"Skipping checkpoint in 0x{bytes(tx_hash).hex()}: malformed call input")
+        return None
+    if decode:
+        payload = codec.decode_payload(payload, fixed_size=target.signature == BOUNDED_SIGNATURE)
+    return CheckpointCall(block_number, tx_index, bytes(tx_hash), sender, payload)
+
+
+def filter_raw_blocks(
+    raw_responses: list[bytes], targets_by_call: dict[tuple[str, str], ScanTarget], decode: bool
+) -> list[tuple[int, str, list[tuple[ScanTarget, CheckpointCall]]]]:
+    """Find the calls of targets in raw ``eth_getBlockByNumber`` responses, as returned by `fetch_raw_blocks`.
+
+    Runs in the worker processes of `iter_target_calls`. Transactions are matched on the hex strings of the
+    response, and only the inputs of matching transactions are converted to bytes and decoded.
+
+    Args:
+        raw_responses: response bodies of single or batch requests for consecutive blocks
+        targets_by_call: targets by lowercase contract address and 0x prefixed selector
+        decode: decompress payloads stored with `--compress`
+    Returns:
+        number, hash and calls of every block, in block order
+    """
+    blocks = []
+    for raw_response in raw_responses:
+        response = json.loads(raw_response)
+        blocks.extend(item['result'] for item in (response if isinstance(response, list) else [response]))
+    blocks.sort(key=lambda block: int(block['number'], 16))
+
+    results = []
+    for block in blocks:
+        block_number = int(block['number'], 16)
+        calls = []
+        for tx in block['transactions']:
+            if tx['to'] is None:
+                continue
+            target = targets_by_call.get((tx['to'].lower(), tx['input'][:2 + 2 * SELECTOR_SIZE]))
+            if target is None:
+                continue
+            call = _decode_call(
+                target,
+                bytes.fromhex(tx['input'][2:]),
+                block_number,
+                int(tx['transactionIndex'], 16),
+                bytes.fromhex(tx['hash'][2:]),
+                Web3.to_checksum_address(tx['from']),
+                decode,
+            )
+            if call is not None:
+                calls.append((target, call))
+        results.append((block_number, block['hash'], calls))
+    return results
+
+
+def _iter_target_calls_in_processes(
+    w3, targets_by_call, start, end, concurrency, chunk_size, batch_size, cursor, decode, processes
+) -> Iterator[tuple[ScanTarget, CheckpointCall]]:
+    """Fetch raw chunks of blocks in threads, filter them in processes and yield the calls in chain order."""
+    raw_targets_by_call = {
+        (address.lower(), '0x' + selector.hex()): target for (address, selector), target in targets_by_call.items()
+    }
+    chunks = iter_chunks(fetch_raw_blocks, w3, start, end, concurrency, chunk_size, batch_size)
+    # forking while the fetch threads hold locks (logging, connection pools) could deadlock the workers
+    executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("forkserver"))
+    # chunks arrive in order and are filtered in a bounded window, so the oldest pending chunk is always next
+    pending = collections.deque()
+
+    def iter_oldest_chunk_calls() -> Iterator[tuple[ScanTarget, CheckpointCall]]:
+        for block_number, block_hash, calls in pending.popleft().result():
+            yield from calls
+            if cursor:
+                cursor.record(block_number, block_hash)
 
+    try:
+        for raw_responses in chunks:
+            pending.append(executor.submit(filter_raw_blocks, raw_responses, raw_targets_by_call, decode))
+            if len(pending) >= 2 * processes:
+                yield from iter_oldest_chunk_calls()
+        while pending:
+            yield from iter_oldest_chunk_calls()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
 
-def main(contract_address, signature):
+
+def iter_logged_checkpoints(
+    w3, contract_address, signature, start, end, batch_size, cursor
+) -> Iterator[CheckpointCall]:
+    """Find checkpoint calls through `Checkpointed` events of an IndexedCheckpoint contract.
+
+    Only the transactions that emitted a matching event are downloaded, to read the payload from their input.
+    """
+    function_selector = Web3.keccak(text=signature)[:SELECTOR_SIZE]
+    topics = [CHECKPOINTED_EVENT_TOPIC, None, '0x' + function_selector.ljust(32, b'\0').hex()]
+    logs = iter_logs(w3, contract_address, topics, start, end)
+
+    while logs_batch := list(itertools.islice(logs, max(batch_size or 1, 1))):
+        with w3.batch_requests() as batch:
+            for log in logs_batch:
+                batch.add(w3.eth.get_transaction(log['transactionHash']))
+            transactions = batch.execute()
+
+        for log, tx in zip(logs_batch, transactions):
+            tx_hash = log['transactionHash'].to_0x_hex()
+            # the checkpoint may have been called by another contract, in which case the transaction input is not
+            # the checkpoint call and the payload cannot be recovered from it
+            if tx['to'] != contract_address or tx['input'][:SELECTOR_SIZE] != function_selector:
+                logger.warning(f"Skipping checkpoint in {tx_hash}: not called directly by the transaction")
+                continue
+            payload = PAYLOAD_DECODERS[signature](tx['input'])
+            if payload is None or Web3.keccak(payload) != log['data']:
+                logger.warning(f"Skipping checkpoint in {tx_hash}: payload does not match the emitted hash")
+                continue
+
+            sender = Web3.to_checksum_address(log['topics'][1][-20:])
+            yield CheckpointCall(
+                log['blockNumber'], log['transactionIndex'], bytes(log['transactionHash']), sender, payload
+            )
+
+    if cursor and start <= end:
+        # the hashes of all blocks that may still be reorganized let the next scan find where to resume
+        with w3.batch_requests() as batch:
+            for number in range(max(start, end - cursor.reorg_depth + 1), end + 1):
+                batch.add(w3.eth.get_block(number))
+            for block in batch.execute():
+                cursor.advance(block)
+
+
+def iter_checkpoint_calls(
+    w3: Web3,
+    contract_address: str,
+    signature: str,
+    start: int,
+    end: int,
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    batch_size: int | None = DEFAULT_BATCH_SIZE,
+    use_logs: bool = False,
+    cursor: ScanCursor | None = None,
+    decode: bool = True,
+    processes: int | None = None,
+) -> Iterator[CheckpointCall]:
+    """Yield calls of a checkpoint function in blocks ``[start, end]``, in chain order.
+
+    Blocks are fetched lazily with a bounded prefetch window, so memory use does not depend on the size of the range.
+
+    Args:
+        w3: Web3 instance
+        contract_address: address of the Checkpoint contract
+        signature: BOUNDED_SIGNATURE or UNBOUNDED_SIGNATURE
+        start: first block to scan
+        end: last block to scan (inclusive)
+        concurrency: maximum number of block chunks fetched at the same time
+        chunk_size: number of consecutive blocks fetched by a single worker
+        batch_size: maximum number of requests in one JSON-RPC batch, `None` or 1 to disable batching
+        use_logs: find calls through events of an IndexedCheckpoint contract instead of scanning every transaction
+        cursor: if given, advanced to every scanned block
+        decode: decompress payloads stored with `--compress`; payloads that are not compressed are not changed
+        processes: number of worker processes filtering and decoding fetched blocks, `None` to do it in this one;
+            only used when scanning transactions, requires a connection from `common.get_web3_connection`
+    Yields:
+        CheckpointCall records
+    """
     assert signature in [BOUNDED_SIGNATURE, UNBOUNDED_SIGNATURE], f"Invalid signature: {signature}"
+    contract_address = Web3.to_checksum_address(contract_address)
+
+    if not use_logs:
+        target_calls = iter_target_calls(
+            w3,
+            [ScanTarget(contract_address, signature)],
+            start,
+            end,
+            concurrency=concurrency,
+            chunk_size=chunk_size,
+            batch_size=batch_size,
+            cursor=cursor,
+            decode=decode,
+            processes=processes,
+        )
+        return (call for _, call in target_calls)
+
+    calls = iter_logged_checkpoints(w3, contract_address, signature, start, end, batch_size, cursor)
+    if decode:
+        calls = decode_calls(calls, fixed_size=signature == BOUNDED_SIGNATURE)
+    return calls
+
+
+def decode_calls(calls: Iterable[CheckpointCall], fixed_size: bool) -> Iterator[CheckpointCall]:
+    """Decode the payloads of `calls` with `codec.decode_payload`."""
+    for call in calls:
+        payload = codec.decode_payload(call.payload, fixed_size)
+        yield call if payload is call.payload else replace(call, payload=payload)
+
+
+def load_hotkey_index(path) -> dict[str, tuple[str, int]]:
+    """Load a reverse index of h160 addresses to hotkeys and UIDs, as saved by the bridge's `HotkeyIndex`."""
+    with open(path) as f:
+        content = json.load(f)
+    return {address.lower(): (hotkey, uid) for address, (hotkey, uid) in content['entries'].items()}
 
-    # Compute the function selector from the signature
-    function_selector = Web3.keccak(text=signature)[:4].to_0x_hex()
 
-    with open(OUTPUT_FILE, mode='w', newline='') as csv_file:
-        csv_writer = csv.writer(csv_file)
-        csv_writer.writerow(['block', 'sender', 'argument'])  # Write header
+def truncate_output(output_file, first_block):
+    """Drop rows of blocks from `first_block` on, left by an interrupted or reorganized previous scan."""
+    with open(output_file, mode='r', newline='') as csv_file:
+        rows = list(csv.reader(csv_file))
 
-        current_block_num = w3.eth.block_number
+    kept_rows = rows[:1] + [row for row in rows[1:] if int(row[0]) < first_block]
+    if len(kept_rows) != len(rows):
+        with open(output_file, mode='w', newline='') as csv_file:
+            csv.writer(csv_file).writerows(kept_rows)
+
+
+def output_file_for(target: ScanTarget, targets: list[ScanTarget]) -> str:
+    """CSV file for the calls of `target`: OUTPUT_FILE when scanning a single target, a file per target otherwise."""
+    if len(targets) == 1:
+        return OUTPUT_FILE
+    kind = next(kind for kind, signature in SIGNATURES_BY_KIND.items() if signature == target.signature)
+    name, extension = os.path.splitext(OUTPUT_FILE)
+    return f'{name}_{target.contract_address}_{kind}{extension}'
+
+
+class CallSink:
+    """Writes the calls of a single scan target to its CSV file, and optionally to blobs and a checkpoint index."""
+
+    def __init__(self, target, output_file, output_mode, hotkey_index=None, blob_dir=None, decode=True, index=None):
+        self.target = target
+        self.output_file = output_file
+        self.hotkey_index = hotkey_index
+        self.blob_dir = blob_dir
+        self.decode = decode
+        self.index = index
+        self.indexed_calls = []
+        self.blob_assembler = BlobAssembler() if blob_dir else None
+
+        header = ['block', 'sender', 'argument']
+        if hotkey_index is not None:
+            header += ['hotkey', 'uid']
+        if output_mode == 'a' and os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+            with open(output_file, newline='') as csv_file:
+                existing_header = next(csv.reader(csv_file), None)
+            if existing_header != header:
+                raise ValueError(
+                    f"{output_file} has columns {existing_header} instead of {header}, "
+                    "scan with the same --hotkey-index setting as before or without --cursor"
+                )
+
+        self.csv_file = open(output_file, mode=output_mode, newline='')
+        self.csv_writer = csv.writer(self.csv_file)
+        if self.csv_file.tell() == 0:
+            self.csv_writer.writerow(header)
+
+    def add(self, call: CheckpointCall) -> None:
+        row = [call.block_number, call.sender, call.payload.hex()]
+        if self.hotkey_index is not None:
+            row += self.hotkey_index.get(call.sender.lower(), ('', ''))
+        self.csv_writer.writerow(row)
+        if self.blob_assembler:
+            blob = self.blob_assembler.add(call.sender, call.block_number, call.payload)
+            if blob is not None:
+                blob_path = os.path.join(self.blob_dir, f'{blob.sender}_{blob.blob_id.hex()}.bin')
+                with open(blob_path, mode='wb') as blob_file:
+                    blob_file.write(codec.decode_payload(blob.data) if self.decode else blob.data)
+                print(f'Blob of {blob.sender} completed in block {blob.block_number} saved to {blob_path}')
+        if self.index:
+            self.indexed_calls.append(
+                IndexedCall(
+                    call.block_number,
+                    call.tx_index,
+                    '0x' + call.tx_hash.hex(),
+                    self.target.contract_address,
+                    self.target.signature,
+                    call.sender,
+                    call.payload,
+                )
+            )
+            if len(self.indexed_calls) >= INDEX_BATCH_SIZE:
+                self.index.add_calls(self.indexed_calls)
+                self.indexed_calls = []
+
+    def close(self) -> None:
+        if self.index:
+            self.index.add_calls(self.indexed_calls)
+            self.indexed_calls = []
+        self.csv_file.close()
+
+
+def main(
+    w3,
+    targets,
+    concurrency=DEFAULT_CONCURRENCY,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    batch_size=DEFAULT_BATCH_SIZE,
+    cursor_file=None,
+    use_logs=False,
+    index_file=None,
+    blob_dir=None,
+    decode=True,
+    hotkey_index_file=None,
+    processes=None,
+):
+    """Scan recent blocks for calls of `targets`, writing the calls of every target to its own sink in one pass."""
+    targets = [
+        replace(target, contract_address=Web3.to_checksum_address(target.contract_address)) for target in targets
+    ]
+    assert blob_dir is None or all(t.signature == UNBOUNDED_SIGNATURE for t in targets), \
+        "Blobs are stored with unbounded calls only"
+    assert not use_logs or len(targets) == 1, "Only a single target can be found through logs"
+    current_block_num = w3.eth.block_number
+    ending_block_num = current_block_num
+
+    # With a cursor, only blocks that were not scanned yet are scanned and results are appended
+    cursor = ScanCursor(cursor_file) if cursor_file else None
+    resume_block_num = cursor.resume_block(w3) if cursor else None
+    index = CheckpointIndex(index_file) if index_file else None
+    if resume_block_num is None:
         starting_block_num = current_block_num - NUMBER_OF_RECENT_BLOCKS_TO_CHECK
-        ending_block_num = current_block_num
+        output_mode = 'w'
+    else:
+        starting_block_num = resume_block_num
+        output_mode = 'a'
+        for target in targets:
+            if os.path.exists(output_file_for(target, targets)):
+                truncate_output(output_file_for(target, targets), starting_block_num)
+            if index:
+                index.remove_from_block(target.contract_address, target.signature, starting_block_num)
 
-        # Iterate through the blocks and transactions
-        for block_number in range(starting_block_num, ending_block_num + 1):
-            block = w3.eth.get_block(block_number, full_transactions=True)
-            for tx in block.transactions:
-                if tx['to'] == contract_address and tx['input'].to_0x_hex()[:10] == function_selector:
-                    argument = tx['input'].to_0x_hex()[BYTES_TO_SKIP[signature]:]  
-                    sender = tx['from']
+    if use_logs:
+        target = targets[0]
+        calls = iter_checkpoint_calls(
+            w3,
+            target.contract_address,
+            target.signature,
+            starting_block_num,
+            ending_block_num,
+            batch_size=batch_size,
+            use_logs=True,
+            cursor=cursor,
+            decode=decode,
+        )
+        target_calls = ((target, call) for call in calls)
+    else:
+        target_calls = iter_target_calls(
+            w3,
+            targets,
+            starting_block_num,
+            ending_block_num,
+            concurrency=concurrency,
+            chunk_size=chunk_size,
+            batch_size=batch_size,
+            cursor=cursor,
+            decode=decode,
+            processes=processes,
+        )
 
-                    csv_writer.writerow([block_number, sender, argument])
+    hotkey_index = load_hotkey_index(hotkey_index_file) if hotkey_index_file else None
+    sinks = {
+        target: CallSink(
+            target, output_file_for(target, targets), output_mode, hotkey_index, blob_dir, decode, index
+        )
+        for target in targets
+    }
+    try:
+        for target, call in target_calls:
+            sinks[target].add(call)
+    finally:
+        for sink in sinks.values():
+            sink.close()
 
-    print(f'Results saved to {OUTPUT_FILE}')
+    if index:
+        index.close()
+
+    if cursor:
+        cursor.save()
+
+    for sink in sinks.values():
+        print(f'Results saved to {sink.output_file}')
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3 or sys.argv[2] not in ['bounded', 'unbounded']:
-        print("Usage: python filter_transactions.py <contract_address> <bounded|unbounded>")
-        sys.exit(1)
-
-    contract_address = sys.argv[1]
-    
-    signature = BOUNDED_SIGNATURE if sys.argv[2] == "bounded" else UNBOUNDED_SIGNATURE
-    main(contract_address, signature)
+    parser = argparse.ArgumentParser(description="Find calls to a checkpoint contract in recent blocks")
+    parser.add_argument("contract_address", help="The address of the deployed Checkpoint contract")
+    parser.add_argument("kind", choices=list(SIGNATURES_BY_KIND), help="Which checkpoint function to track")
+    parser.add_argument(
+        "--target",
+        nargs=2,
+        action="append",
+        default=[],
+        metavar=("CONTRACT_ADDRESS", "KIND"),
+        help="Track calls of another contract or function in the same scan, can be repeated; "
+        "the calls of every target are then saved to a separate transactions_<address>_<kind>.csv",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Number of block chunks fetched in parallel"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Number of consecutive blocks fetched per worker"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Maximum number of blocks requested in one JSON-RPC batch (1 disables batching); "
+        "shrinks automatically if the node rejects large batches",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        help="Filter and decode fetched blocks in this many worker processes, for long scans that are limited by CPU "
+        "rather than by the RPC node",
+    )
+    parser.add_argument(
+        "--cursor",
+        help="JSON file remembering the last scanned block; when given, only new blocks are scanned "
+        f"and results are appended to {OUTPUT_FILE}",
+    )
+    parser.add_argument(
+        "--logs",
+        action="store_true",
+        help="Find calls through Checkpointed events with eth_getLogs instead of scanning every transaction; "
+        "only works for IndexedCheckpoint contracts",
+    )
+    parser.add_argument(
+        "--index",
+        help="SQLite file to store found calls in, in addition to the CSV output; query it with checkpoint_index.py",
+    )
+    parser.add_argument(
+        "--blob-dir",
+        help="Reassemble blobs stored with call_unbounded.py --blob and save them to this directory "
+        "(unbounded only)",
+    )
+    parser.add_argument(
+        "--raw",
+        action="store_true",
+        help="Output payloads exactly as stored, without decompressing payloads stored with --compress",
+    )
+    parser.add_argument(
+        "--hotkey-index",
+        help="JSON index of h160 addresses to hotkeys and UIDs, built with h160_ss58_bridge/knowledge_commitment.py; "
+        "adds the hotkey and UID of every sender to the output",
+    )
+    args = parser.parse_args()
+    if args.blob_dir:
+        os.makedirs(args.blob_dir, exist_ok=True)
+
+    scan_targets = []
+    for contract_address, kind in [(args.contract_address, args.kind), *args.target]:
+        if kind not in SIGNATURES_BY_KIND:
+            parser.error(f"invalid kind {kind!r} of target {contract_address}, choose from {list(SIGNATURES_BY_KIND)}")
+        if not Web3.is_address(contract_address):
+            parser.error(f"invalid contract address {contract_address}")
+        scan_targets.append(ScanTarget(Web3.to_checksum_address(contract_address), SIGNATURES_BY_KIND[kind]))
+    if args.logs and len(scan_targets) > 1:
+        parser.error("--logs cannot be combined with --target")
+
+    main(
+        get_web3_connection(default_rpc_url=DEFAULT_RPC_URL),
+        list(dict.fromkeys(scan_targets)),
+        args.concurrency,
+        args.chunk_size,
+        args.batch_size,
+        args.cursor,
+        args.logs,
+        args.index,
+        args.blob_dir,
+        not args.raw,
+        args.hotkey_index,
+        args.processes,
+    )
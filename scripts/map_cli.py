@@ -2,21 +2,31 @@
 
 import argparse
 import datetime
+import functools
+import hashlib
 import json
 import logging
+import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
 import requests
+from eth_abi import encode
 from common import (
+    TX_BASE_GAS,
+    TransactionSender,
     build_and_send_transaction,
+    calldata_gas,
     get_account,
     get_web3_connection,
     validate_address_format,
     wait_for_receipt,
 )
 from eth_account.signers.local import LocalAccount
+from map_snapshot import write_snapshot
 from pydantic import BaseModel, ValidationError
 from web3 import Web3
 
@@ -26,6 +36,19 @@ logger = logging.getLogger(__name__)
 
 ENVIRONMENT_CHOICES = ["preprod", "prod", "staging", "testing", "testnet"]
 DEFAULT_GAS_LIMIT = 1000000
+DEFAULT_MAX_GAS_PER_TRANSACTION = 5000000
+# Execution gas of `storeMany` itself and of storing a single pair, on top of writing the value's storage slots
+STORE_MANY_EXECUTION_GAS = 30000
+STORE_PAIR_EXECUTION_GAS = 10000
+# a fresh (cold, previously zero) storage slot
+STORAGE_SLOT_GAS = 22100
+# pairs read by a single `entries` call and `entries` calls sent in a single batch request
+DEFAULT_PAGE_SIZE = 256
+DEFAULT_PAGES_PER_BATCH = 8
+FETCH_TIMEOUT = 30
+DEFAULT_REFRESH_INTERVAL = 3600
+# first delay before the daemon retries a failed sync, doubled up to the refresh interval on every failure
+DAEMON_RETRY_DELAY = 60.0
 
 
 class ParamItem(BaseModel):
@@ -37,8 +60,11 @@ class Param(BaseModel):
     description: str
     items: list[ParamItem]
 
-    def get_effective_item(self) -> ParamItem | None:
-        now = datetime.datetime.now(datetime.UTC)
+    def get_effective_item(
+        self, now: datetime.datetime | None = None
+    ) -> ParamItem | None:
+        if now is None:
+            now = datetime.datetime.now(datetime.UTC)
         effective_item = None
         for param_item in self.items:
             if param_item.effective_from is None or param_item.effective_from <= now:
@@ -47,11 +73,74 @@ class Param(BaseModel):
         return effective_item
 
 
+def utc_now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.UTC)
+
+
 class ConfigFetchError(Exception):
     """Custom exception for configuration fetch errors."""
     pass
 
 
+class ConfigCache:
+    """On-disk cache of fetched configs and of past syncs.
+
+    Configs are stored with their ETag and Last-Modified headers, so they can be revalidated with
+    conditional requests. For every contract, the hashes of the configs it was last synced with are
+    stored together with the time of that sync.
+    """
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _read(self, name: str) -> dict | None:
+        try:
+            return json.loads((self.directory / name).read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache file {name}: {e!r}")
+            return None
+
+    def _write(self, name: str, content: dict) -> None:
+        path = self.directory / name
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        tmp_path.write_text(json.dumps(content))
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _response_name(url: str) -> str:
+        return f"response-{hashlib.sha256(url.encode()).hexdigest()[:16]}.json"
+
+    def get_response(self, url: str) -> dict | None:
+        """Return the cached response of `url`: its `data` and `etag` and `last_modified` headers."""
+        return self._read(self._response_name(url))
+
+    def put_response(
+        self, url: str, etag: str | None, last_modified: str | None, data: dict
+    ) -> None:
+        self._write(
+            self._response_name(url),
+            {"url": url, "etag": etag, "last_modified": last_modified, "data": data},
+        )
+
+    def get_sync_state(self, contract_address: str) -> dict | None:
+        return self._read(f"sync-{contract_address.lower()}.json")
+
+    def put_sync_state(
+        self, contract_address: str, synced_at: datetime.datetime, config_hashes: list[str]
+    ) -> None:
+        self._write(
+            f"sync-{contract_address.lower()}.json",
+            {"synced_at": synced_at.isoformat(), "config_hashes": config_hashes},
+        )
+
+
+def config_hash(config_data: dict) -> str:
+    return hashlib.sha256(json.dumps(config_data, sort_keys=True).encode()).hexdigest()
+
+
 def build_config_urls(env: str, service: str) -> list[str]:
     base_url = "https://raw.githubusercontent.com/backend-developers-ltd/compute-horde-dynamic-config/master"
     return [
@@ -60,11 +149,19 @@ def build_config_urls(env: str, service: str) -> list[str]:
     ]
 
 
+@functools.cache
 def load_contract_abi():
     path = Path(__file__).parent.parent / "map_abi.json"
     return json.loads(path.read_bytes())
 
 
+def get_map_contract(w3: Web3, contract_address: str):
+    validate_address_format(contract_address)
+    return w3.eth.contract(
+        address=w3.to_checksum_address(contract_address), abi=load_contract_abi()
+    )
+
+
 def store_value(
     w3: Web3, account: LocalAccount, contract_address: str, key: str, value: str
 ):
@@ -80,12 +177,7 @@ def store_value(
     Returns:
         receipt
     """
-    validate_address_format(contract_address)
-
-    contract_abi = load_contract_abi()
-    contract = w3.eth.contract(
-        address=w3.to_checksum_address(contract_address), abi=contract_abi
-    )
+    contract = get_map_contract(w3, contract_address)
 
     function_call = contract.functions.store(key, value)
     tx_hash = build_and_send_transaction(
@@ -96,6 +188,87 @@ def store_value(
     return receipt
 
 
+def store_pair_gas(key: str, value: str) -> int:
+    """Upper estimate of the gas a single pair adds to a `storeMany` transaction."""
+    # the value, and for a new key the key's copy in the key list and its position
+    slots = string_slots(value) + string_slots(key) + 1
+    return (
+        calldata_gas(encode(["string", "string"], [key, value]))
+        + STORE_PAIR_EXECUTION_GAS
+        + slots * STORAGE_SLOT_GAS
+    )
+
+
+def string_slots(string: str) -> int:
+    """Number of storage slots taken by `string`."""
+    # short strings are kept in a single slot, longer ones take a length slot and one slot per 32 bytes
+    size = len(string.encode())
+    return 1 if size < 32 else 1 + -(-size // 32)
+
+
+def split_store_batches(
+    items: dict[str, str], max_gas_per_transaction: int
+) -> list[dict[str, str]]:
+    """Group key-value pairs into `storeMany` batches that fit into `max_gas_per_transaction`.
+
+    A pair that does not fit even on its own gets a batch of its own.
+    """
+    batches = []
+    batch: dict[str, str] = {}
+    batch_gas = TX_BASE_GAS + STORE_MANY_EXECUTION_GAS
+    for key, value in items.items():
+        pair_gas = store_pair_gas(key, value)
+        if batch and batch_gas + pair_gas > max_gas_per_transaction:
+            batches.append(batch)
+            batch = {}
+            batch_gas = TX_BASE_GAS + STORE_MANY_EXECUTION_GAS
+        batch[key] = value
+        batch_gas += pair_gas
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def store_many_gas_limit(batch: dict[str, str]) -> int:
+    """Gas limit for a `storeMany` call storing `batch`."""
+    return (
+        TX_BASE_GAS
+        + STORE_MANY_EXECUTION_GAS
+        + sum(store_pair_gas(key, value) for key, value in batch.items())
+    )
+
+
+def store_values(
+    w3: Web3,
+    account: LocalAccount,
+    contract_address: str,
+    items: dict[str, str],
+    max_gas_per_transaction: int = DEFAULT_MAX_GAS_PER_TRANSACTION,
+) -> list:
+    """
+    Store or delete multiple values in the Map contract with as few `storeMany` transactions as possible.
+
+    Args:
+        w3: Web3 instance
+        account: Account to use for the transactions (must be admin)
+        contract_address: Address of the Map contract
+        items: Values to store by key. Empty values delete their keys
+        max_gas_per_transaction: Gas budget of a single transaction
+    Returns:
+        receipts, one for each batch
+    """
+    contract = get_map_contract(w3, contract_address)
+    with TransactionSender(w3, account) as sender:
+        futures = [
+            sender.send(
+                contract.functions.storeMany(list(batch.keys()), list(batch.values())),
+                gas_limit=store_many_gas_limit(batch),
+            )
+            for batch in split_store_batches(items, max_gas_per_transaction)
+        ]
+        return [future.result() for future in futures]
+
+
 def read_values(w3: Web3, contract_address: str, keys: list[str]) -> list[str]:
     logger.info(f"Reading values from {contract_address} for keys: {keys}")
     validate_address_format(contract_address)
@@ -110,6 +283,70 @@ def read_values(w3: Web3, contract_address: str, keys: list[str]) -> list[str]:
     return results
 
 
+def read_entries(
+    w3: Web3,
+    contract_address: str,
+    block_identifier: int | str = "latest",
+    page_size: int = DEFAULT_PAGE_SIZE,
+    pages_per_batch: int = DEFAULT_PAGES_PER_BATCH,
+) -> dict[str, str]:
+    """
+    Read all key-value pairs of the Map contract.
+
+    Pages of `entries` are read with batched `eth_call`s, all at the same block, so the result is
+    a consistent view of the map even if it is written in the meantime.
+
+    Args:
+        w3: Web3 instance
+        contract_address: Address of the Map contract
+        block_identifier: Block to read the map at
+        page_size: Number of pairs read by a single call
+        pages_per_batch: Number of calls sent in a single batch request
+    Returns:
+        values by key
+    """
+    contract = get_map_contract(w3, contract_address)
+    if block_identifier == "latest":
+        block_identifier = w3.eth.block_number
+    key_count = contract.functions.keyCount().call(block_identifier=block_identifier)
+    logger.info(f"Reading {key_count} values from {contract_address} at block {block_identifier}")
+
+    items: dict[str, str] = {}
+    offsets = range(0, key_count, page_size)
+    for batch_start in range(0, len(offsets), pages_per_batch):
+        with w3.batch_requests() as batch:
+            for offset in offsets[batch_start:batch_start + pages_per_batch]:
+                batch.add(
+                    contract.functions.entries(offset, page_size).call(
+                        block_identifier=block_identifier
+                    )
+                )
+            pages = batch.execute()
+        for page_keys, page_values in pages:
+            items.update(zip(page_keys, page_values))
+    return items
+
+
+def snapshot(
+    w3: Web3, contract_address: str, path: str | Path, page_size: int = DEFAULT_PAGE_SIZE
+) -> int:
+    """
+    Save all key-value pairs of the Map contract to a snapshot file, see `map_snapshot.MapSnapshot`.
+
+    Args:
+        w3: Web3 instance
+        contract_address: Address of the Map contract
+        path: File to write the snapshot to
+        page_size: Number of pairs read by a single call
+    Returns:
+        number of the block the snapshot was taken at
+    """
+    block_number = w3.eth.block_number
+    items = read_entries(w3, contract_address, block_number, page_size=page_size)
+    write_snapshot(path, block_number, items)
+    return block_number
+
+
 def read_value(w3, contract_address: str, key: str):
     """
     Read a value from the Map contract for a given key.
@@ -130,74 +367,347 @@ def read_value(w3, contract_address: str, key: str):
 
 
 class ConfigSyncer:
-    """Handles syncing dynamic configuration from GitHub to Map contract."""
+    """Handles syncing dynamic configuration from GitHub to Map contract.
+
+    With `concurrent`, all changed keys are stored without waiting for each other: the `store`
+    transactions are signed with consecutive nonces, broadcast together and their receipts are awaited
+    concurrently. With `max_gas_per_transaction`, changed keys are grouped into `storeMany` transactions
+    of at most that much gas instead.
+
+    With `prune`, keys that are in the contract but not in the config are deleted. This requires a contract
+    with key enumeration and assumes the contract holds the config of a single service.
+    """
 
-    def __init__(self, w3: Web3, account: LocalAccount, contract_address: str):
+    def __init__(
+        self,
+        w3: Web3,
+        account: LocalAccount,
+        contract_address: str,
+        concurrent: bool = False,
+        max_gas_per_transaction: int | None = None,
+        prune: bool = False,
+        cache: ConfigCache | None = None,
+    ):
         self.w3 = w3
         self.account = account
         self.contract_address = contract_address
+        self.concurrent = concurrent
+        self.max_gas_per_transaction = max_gas_per_transaction
+        self.prune = prune
+        self.cache = cache
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = "backend-developers-ltd"
         self.stats = {"stored": 0, "skipped": 0, "failed": 0, "unchanged": 0}
+        # params of the last fetched configs and their effective values as of the last sync
+        self.params: list[tuple[str, Param]] = []
+        self.effective_config: dict[str, str] = {}
+        self._config_hashes: list[str] = []
 
     def fetch_config(self, url: str) -> dict:
         """
         Fetch configuration from the given URL.
 
+        With a cache, the request is conditional and a cached config that was not modified is returned
+        without downloading it again.
+
         Args:
             url: The URL to fetch the configuration from.
         Returns:
             Parsed JSON configuration data.
         """
         logger.info(f"Fetching config from {url}")
+        cached = self.cache.get_response(url) if self.cache is not None else None
+        headers = {}
+        if cached is not None:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
         try:
-            headers = {"User-Agent": "backend-developers-ltd"}
-            response = requests.get(url, headers=headers)
+            response = self.session.get(url, headers=headers, timeout=FETCH_TIMEOUT)
+            if response.status_code == 304 and cached is not None:
+                logger.info(f"Config at {url} not modified")
+                return cached["data"]
             response.raise_for_status()
-            return response.json()
+            config_data = response.json()
         except requests.RequestException as e:
             raise ConfigFetchError(f"Failed to fetch config from {url}") from e
         except json.JSONDecodeError as e:
             raise ConfigFetchError(f"Invalid JSON format in config from {url}") from e
 
+        if self.cache is not None:
+            self.cache.put_response(
+                url,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+                config_data,
+            )
+        return config_data
+
+    def fetch_configs(self, urls: list[str]) -> list[dict]:
+        """Fetch configurations from all `urls` concurrently."""
+        with ThreadPoolExecutor(max_workers=max(1, len(urls))) as executor:
+            return list(executor.map(self.fetch_config, urls))
+
+    def is_synced(
+        self, configs: list[dict], params: list[tuple[str, Param]], now: datetime.datetime
+    ) -> bool:
+        """Whether the contract was synced with `configs` and no item became effective since."""
+        state = self.cache.get_sync_state(self.contract_address) if self.cache is not None else None
+        if state is None or state["config_hashes"] != [config_hash(c) for c in configs]:
+            return False
+        synced_at = datetime.datetime.fromisoformat(state["synced_at"])
+        return not any(
+            item.effective_from is not None and synced_at < item.effective_from <= now
+            for _, param in params
+            for item in param.items
+        )
+
+    def get_effective_config(self, now: datetime.datetime) -> dict[str, str]:
+        """Return the values of all params effective at `now`."""
+        effective_config: dict[str, str] = {}
+        for key, param in self.params:
+            item = param.get_effective_item(now)
+            if item is not None:
+                effective_config[key] = json.dumps(item.value)
+        return effective_config
+
+    def get_next_boundary(self, now: datetime.datetime) -> datetime.datetime | None:
+        """Return the earliest `effective_from` after `now`, if any."""
+        return min(
+            (
+                item.effective_from
+                for _, param in self.params
+                for item in param.items
+                if item.effective_from is not None and item.effective_from > now
+            ),
+            default=None,
+        )
+
     def sync_config_from_urls(self, config_urls: list[str]) -> None:
         """Sync configuration from a list of URLs to the Map contract."""
 
-        full_url_config: dict[str, str] = {}
-        for config_url in config_urls:
-            config_data = self.fetch_config(config_url)
+        now = utc_now()
+        configs = self.fetch_configs(config_urls)
+        params: list[tuple[str, Param]] = []
+        for config_data in configs:
             for key, value in config_data.items():
                 try:
-                    param = Param.model_validate(value)
+                    params.append((key, Param.model_validate(value)))
                 except ValidationError as e:
                     logger.warning(f"Invalid param format for {key}: {e}")
-                    continue
+        self.params = params
+        self._config_hashes = [config_hash(c) for c in configs]
+        full_url_config = self.get_effective_config(now)
 
-                item = param.get_effective_item()
-                if item is not None:
-                    full_url_config[key] = json.dumps(item.value)
+        if self.is_synced(configs, params, now):
+            logger.info("Config unchanged since the last sync, nothing to do")
+            self.effective_config = full_url_config
+            return
 
         config_keys = list(full_url_config.keys())
-        current_map_values = read_values(self.w3, self.contract_address, config_keys)
+        changes: dict[str, tuple[str, str]] = {}
+        if self.prune:
+            # keys that are in a config but invalid or not effective yet keep their current value
+            configured_keys = {key for config_data in configs for key in config_data}
+            map_items = read_entries(self.w3, self.contract_address)
+            current_map_values = [map_items.get(key, "") for key in config_keys]
+            for key, map_value in map_items.items():
+                if key not in configured_keys:
+                    logger.info(f"Config {key} removed, deleting it (was: {map_value})")
+                    changes[key] = ("", map_value)
+        else:
+            current_map_values = read_values(self.w3, self.contract_address, config_keys)
 
         for key, map_value in zip(config_keys, current_map_values):
             new_value = full_url_config[key]
             if new_value != map_value:
-                try:
-                    store_value(
-                        w3=self.w3,
-                        account=self.account,
-                        contract_address=self.contract_address,
-                        key=key,
-                        value=new_value,
-                    )
-                    logger.info(f"Set config {key}={new_value} (was: {map_value})")
-                    self.stats["stored"] += 1
-                except Exception as e:
-                    logger.error(f"Failed to set config {key}={new_value}: {e!r}")
-                    self.stats["failed"] += 1
+                changes[key] = (new_value, map_value)
             else:
                 logger.info(f"Config {key}={new_value} unchanged, skipping store")
                 self.stats["unchanged"] += 1
 
+        failed = self.stats["failed"]
+        stored_keys = self.store(changes)
+        self.update_effective_config(full_url_config, changes, stored_keys)
+
+        if self.cache is not None and self.stats["failed"] == failed:
+            self.cache.put_sync_state(self.contract_address, now, self._config_hashes)
+
+    def activate_due_items(self) -> None:
+        """Store the keys whose effective item changed since the last sync or activation.
+
+        Unlike `sync_config_from_urls`, neither the configs nor the contract are read again.
+        """
+        now = utc_now()
+        new_config = self.get_effective_config(now)
+        changes = {
+            key: (new_value, self.effective_config.get(key, ""))
+            for key, new_value in new_config.items()
+            if self.effective_config.get(key) != new_value
+        }
+        logger.info(f"Activating {len(changes)} config items effective from {now}")
+
+        failed = self.stats["failed"]
+        stored_keys = self.store(changes)
+        self.update_effective_config(new_config, changes, stored_keys)
+
+        if self.cache is not None and self.stats["failed"] == failed:
+            self.cache.put_sync_state(self.contract_address, now, self._config_hashes)
+
+    def update_effective_config(
+        self, config: dict[str, str], changes: dict[str, tuple[str, str]], stored_keys: set[str]
+    ) -> None:
+        """Set `effective_config` to `config`, except for the changed keys that could not be stored.
+
+        Those keep their previous value, so that `activate_due_items` stores them again.
+        """
+        effective_config = dict(config)
+        for key, (_, map_value) in changes.items():
+            if key in stored_keys:
+                continue
+            if map_value:
+                effective_config[key] = map_value
+            else:
+                effective_config.pop(key, None)
+        self.effective_config = effective_config
+
+    def has_pending_changes(self) -> bool:
+        """Whether some effective values are not known to be stored in the contract."""
+        return self.effective_config != self.get_effective_config(utc_now())
+
+    def run_daemon(self, config_urls: list[str], refresh_interval: float) -> None:
+        """Keep the contract in sync with the configs, forever.
+
+        Configs are fully synced every `refresh_interval` seconds. In between, the daemon sleeps until
+        the next `effective_from` boundary and then stores only the keys whose effective item changed.
+        Failed syncs and keys that could not be stored are retried after a backoff, starting at
+        `DAEMON_RETRY_DELAY` seconds.
+        """
+        retry_delay = DAEMON_RETRY_DELAY
+        next_refresh = time.monotonic()
+        while True:
+            full_sync = time.monotonic() >= next_refresh
+            try:
+                if full_sync:
+                    next_refresh = time.monotonic() + refresh_interval
+                    self.sync_config_from_urls(config_urls)
+                else:
+                    self.activate_due_items()
+                failed = self.has_pending_changes()
+            except Exception as e:
+                logger.error(f"Failed to sync config: {e!r}")
+                if full_sync:
+                    next_refresh = time.monotonic() + retry_delay
+                failed = True
+            self.print_stats()
+
+            retry_at = None
+            if failed:
+                logger.warning(f"Some config could not be stored, retrying in {retry_delay:.0f}s")
+                retry_at = time.monotonic() + retry_delay
+                retry_delay = min(retry_delay * 2, refresh_interval)
+            else:
+                retry_delay = DAEMON_RETRY_DELAY
+
+            now = utc_now()
+            boundary = self.get_next_boundary(now)
+            wait = next_refresh - time.monotonic()
+            if boundary is not None:
+                wait = min(wait, (boundary - now).total_seconds())
+            if retry_at is not None:
+                wait = min(wait, retry_at - time.monotonic())
+            if wait > 0:
+                logger.debug(f"Sleeping for {wait:.3f}s (next boundary: {boundary})")
+                time.sleep(wait)
+
+    def store(self, changes: dict[str, tuple[str, str]]) -> set[str]:
+        """Store `changes`, new and previous values by key, in the configured way.
+
+        Returns:
+            keys that were stored
+        """
+        if self.concurrent or self.max_gas_per_transaction is not None:
+            return self.store_changes_with_sender(changes)
+        return self.store_changes(changes)
+
+    def store_changes(self, changes: dict[str, tuple[str, str]]) -> set[str]:
+        """Store changed keys one by one, waiting for each transaction to be mined."""
+        stored_keys = set()
+        for key, (new_value, map_value) in changes.items():
+            try:
+                store_value(
+                    w3=self.w3,
+                    account=self.account,
+                    contract_address=self.contract_address,
+                    key=key,
+                    value=new_value,
+                )
+                logger.info(f"Set config {key}={new_value} (was: {map_value})")
+                self.stats["stored"] += 1
+                stored_keys.add(key)
+            except Exception as e:
+                logger.error(f"Failed to set config {key}={new_value}: {e!r}")
+                self.stats["failed"] += 1
+        return stored_keys
+
+    def store_changes_with_sender(self, changes: dict[str, tuple[str, str]]) -> set[str]:
+        """Store changed keys with `TransactionSender`, in batches if `max_gas_per_transaction` is set.
+
+        Unless `concurrent` is set, each transaction is awaited before the next one is sent.
+        """
+        stored_keys: set[str] = set()
+        if not changes:
+            return stored_keys
+
+        contract = get_map_contract(self.w3, self.contract_address)
+        new_values = {key: new_value for key, (new_value, _) in changes.items()}
+        if self.max_gas_per_transaction is not None:
+            calls = [
+                (
+                    list(batch),
+                    contract.functions.storeMany(list(batch.keys()), list(batch.values())),
+                    store_many_gas_limit(batch),
+                )
+                for batch in split_store_batches(new_values, self.max_gas_per_transaction)
+            ]
+        else:
+            calls = [
+                ([key], contract.functions.store(key, new_value), DEFAULT_GAS_LIMIT)
+                for key, new_value in new_values.items()
+            ]
+
+        max_in_flight = len(calls) if self.concurrent else 1
+        with TransactionSender(self.w3, self.account, max_in_flight=max_in_flight) as sender:
+            futures = []
+            for keys, function_call, gas_limit in calls:
+                try:
+                    futures.append((keys, sender.send(function_call, gas_limit=gas_limit)))
+                except Exception as e:
+                    logger.error(f"Failed to send config {', '.join(keys)}: {e!r}")
+                    self.stats["failed"] += len(keys)
+
+            for keys, future in futures:
+                try:
+                    receipt = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to set config {', '.join(keys)}: {e!r}")
+                    self.stats["failed"] += len(keys)
+                    continue
+                if receipt["status"] != 1:
+                    logger.error(
+                        f"Failed to set config {', '.join(keys)}: "
+                        f"transaction {receipt['transactionHash'].hex()} reverted"
+                    )
+                    self.stats["failed"] += len(keys)
+                    continue
+                for key in keys:
+                    new_value, map_value = changes[key]
+                    logger.info(f"Set config {key}={new_value} (was: {map_value})")
+                self.stats["stored"] += len(keys)
+                stored_keys.update(keys)
+        return stored_keys
+
     def print_stats(self) -> None:
         logger.info(
             f"Sync complete - Stored: {self.stats['stored']}, "
@@ -240,6 +750,36 @@ class CLICommands:
             f"  Value:   {value if value else '(deleted)'}"
         )
 
+    def set_values(self, items: dict[str, str], max_gas_per_transaction: int) -> None:
+        """
+        Set multiple values in the Map contract with batched `storeMany` transactions.
+        """
+        account = get_account()
+        try:
+            receipts = store_values(
+                w3=self.w3,
+                account=account,
+                contract_address=self.contract_address,
+                items=items,
+                max_gas_per_transaction=max_gas_per_transaction,
+            )
+        except Exception as e:
+            logger.error(f"Failed to set values for keys {list(items)}: {e}")
+            sys.exit(1)
+
+        if any(receipt["status"] != 1 for receipt in receipts):
+            logger.error(f"Failed to set values for keys {list(items)}: transaction reverted")
+            sys.exit(1)
+
+        logger.info(f"Successfully stored {len(items)} values in {len(receipts)} transactions")
+        for receipt in receipts:
+            logger.info(
+                "Transaction details:\n"
+                f"  Account: {account.address}\n"
+                f"  Tx Hash: {receipt['transactionHash'].hex()}\n"
+                f"  Block:   {receipt['blockNumber']}"
+            )
+
     def read_value(self, key: str) -> None:
         """
         Read a value from the Map contract.
@@ -251,13 +791,44 @@ class CLICommands:
             logger.warning(f"Failed to read value for key '{key}': {e}", exc_info=True)
             sys.exit(1)
 
-    def sync_values(self, service: str, env: str) -> None:
+    def snapshot(self, output: str) -> None:
+        """
+        Save all key-value pairs of the Map contract to a local snapshot file.
+        """
+        try:
+            block_number = snapshot(self.w3, self.contract_address, output)
+        except Exception as e:
+            logger.error(f"Failed to take a snapshot: {e}")
+            sys.exit(1)
+        logger.info(f"Saved snapshot at block {block_number} to {output}")
+
+    def sync_values(
+        self,
+        service: str,
+        env: str,
+        concurrent: bool = False,
+        max_gas_per_transaction: int | None = None,
+        prune: bool = False,
+        cache_dir: str | None = None,
+        daemon: bool = False,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+    ) -> None:
         """
         Sync dynamic configuration from GitHub to the Map contract.
         """
         account = get_account()
-        syncer = ConfigSyncer(self.w3, account, self.contract_address)
+        syncer = ConfigSyncer(
+            self.w3,
+            account,
+            self.contract_address,
+            concurrent=concurrent,
+            max_gas_per_transaction=max_gas_per_transaction,
+            prune=prune,
+            cache=ConfigCache(cache_dir) if cache_dir else None,
+        )
         config_urls = build_config_urls(env, service)
+        if daemon:
+            return syncer.run_daemon(config_urls, refresh_interval)
         syncer.sync_config_from_urls(config_urls)
         syncer.print_stats()
 
@@ -276,9 +847,20 @@ def build_parser():
     # Set command
     set_parser = subparsers.add_parser("set", help="Store a value in the Map contract")
     set_parser.add_argument(
-        "--key", required=True, help="The key to store the value under"
+        "--key",
+        required=True,
+        action="append",
+        help="The key to store the value under; repeat with --value to store multiple values",
+    )
+    set_parser.add_argument(
+        "--value", required=True, action="append", help="The value to store"
+    )
+    set_parser.add_argument(
+        "--max-gas-per-transaction",
+        type=int,
+        default=DEFAULT_MAX_GAS_PER_TRANSACTION,
+        help="Gas budget of a single storeMany transaction when storing multiple values",
     )
-    set_parser.add_argument("--value", required=True, help="The value to store")
 
     # Get command
     get_parser = subparsers.add_parser("get", help="Read a value from the Map contract")
@@ -299,6 +881,50 @@ def build_parser():
         required=True,
         help="The service to sync configuration for (miner or validator)",
     )
+    sync_parser.add_argument(
+        "--concurrent",
+        action="store_true",
+        help="Send all store transactions at once instead of waiting for each one",
+    )
+    sync_parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Store changed keys with storeMany transactions instead of one transaction per key",
+    )
+    sync_parser.add_argument(
+        "--max-gas-per-transaction",
+        type=int,
+        default=DEFAULT_MAX_GAS_PER_TRANSACTION,
+        help="Gas budget of a single storeMany transaction with --batch",
+    )
+    sync_parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="Delete keys that are not in the config; only for contracts holding the config of a single service",
+    )
+    sync_parser.add_argument(
+        "--cache-dir",
+        help="Directory to cache configs in; skip the sync if nothing changed since the last one",
+    )
+    sync_parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running and store items exactly when they become effective",
+    )
+    sync_parser.add_argument(
+        "--refresh-interval",
+        type=float,
+        default=DEFAULT_REFRESH_INTERVAL,
+        help="With --daemon, seconds between full syncs that pick up config changes",
+    )
+
+    # Snapshot command
+    snapshot_parser = subparsers.add_parser(
+        "snapshot", help="Save all key-value pairs to a local file"
+    )
+    snapshot_parser.add_argument(
+        "--output", required=True, help="The file to write the snapshot to"
+    )
     return parser
 
 
@@ -318,13 +944,33 @@ def main():
     cli_commands = CLICommands(get_web3_connection(), args.contract_address)
 
     if args.command == "set":
-        return cli_commands.set_value(args.key, args.value)
+        if len(args.key) != len(args.value):
+            parser.error("every --key needs a matching --value")
+        if len(args.key) == 1:
+            return cli_commands.set_value(args.key[0], args.value[0])
+        return cli_commands.set_values(
+            dict(zip(args.key, args.value)), args.max_gas_per_transaction
+        )
 
     elif args.command == "get":
         return cli_commands.read_value(args.key)
 
     elif args.command == "sync":
-        return cli_commands.sync_values(args.service, args.env)
+        return cli_commands.sync_values(
+            args.service,
+            args.env,
+            concurrent=args.concurrent,
+            max_gas_per_transaction=(
+                args.max_gas_per_transaction if args.batch else None
+            ),
+            prune=args.prune,
+            cache_dir=args.cache_dir,
+            daemon=args.daemon,
+            refresh_interval=args.refresh_interval,
+        )
+
+    elif args.command == "snapshot":
+        return cli_commands.snapshot(args.output)
 
 
 if __name__ == "__main__":
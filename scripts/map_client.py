@@ -0,0 +1,151 @@
+import collections
+import logging
+import threading
+import time
+
+from map_cli import get_map_contract
+from scanner import DEFAULT_LOG_BLOCK_RANGE, iter_logs
+from web3 import Web3
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_TTL = 300.0
+DEFAULT_MAX_SIZE = 1024
+DEFAULT_POLL_INTERVAL = 2.0
+STORED_EVENT_TOPIC = Web3.keccak(text='Stored(string)').to_0x_hex()
+
+
+class MapClient:
+    """Long-lived, cached reader of a Map contract.
+
+    Values are kept in memory for up to `ttl` seconds, and only the `max_size` most recently used keys are kept.
+    At most every `poll_interval` seconds, the client checks whether the contract was written since the cached
+    values were read, so between checks lookups of cached keys do not touch the RPC node at all:
+
+    * with `watch_events`, `Stored(key)` events of the contract are fetched and only the changed keys are dropped,
+    * otherwise, the whole cache is dropped whenever the transaction count of the contract's admin changes,
+      which works with Map contracts deployed before `Stored` was added.
+
+    Values are read at the block up to which changes have been checked, so a cached value is never older than
+    the client's view of the contract, available as `block_number`.
+    """
+
+    def __init__(
+        self,
+        w3: Web3,
+        contract_address: str,
+        ttl: float = DEFAULT_TTL,
+        max_size: int = DEFAULT_MAX_SIZE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        watch_events: bool = True,
+    ):
+        self.w3 = w3
+        self.contract = get_map_contract(w3, contract_address)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.poll_interval = poll_interval
+        self.watch_events = watch_events
+        self._lock = threading.RLock()
+        self._cache: collections.OrderedDict[str, tuple[str, float]] = collections.OrderedDict()
+        self._admin = None if watch_events else self.contract.functions.ADMIN().call()
+        self._admin_nonce = None
+        self.block_number = None
+        self._polled_at = 0.0
+
+    def invalidate(self, key: str | None = None) -> None:
+        """Drop `key` from the cache, or all keys if None."""
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    def _poll(self) -> None:
+        now = time.monotonic()
+        if self.block_number is not None and now - self._polled_at < self.poll_interval:
+            return
+        self._polled_at = now
+
+        block_number = self.w3.eth.block_number
+        if self.block_number is None:
+            self.block_number = block_number
+            if not self.watch_events:
+                self._admin_nonce = self.w3.eth.get_transaction_count(self._admin, block_number)
+            return
+        if block_number <= self.block_number:
+            return
+
+        if not self.watch_events:
+            admin_nonce = self.w3.eth.get_transaction_count(self._admin, block_number)
+            if admin_nonce != self._admin_nonce:
+                logger.debug(f"Map admin sent transactions up to block {block_number}, dropping cache")
+                self._cache.clear()
+                self._admin_nonce = admin_nonce
+        elif block_number - self.block_number > DEFAULT_LOG_BLOCK_RANGE:
+            # cheaper to read the cached keys again than to go through the events of so many blocks
+            self._cache.clear()
+        else:
+            logs = iter_logs(
+                self.w3,
+                self.contract.address,
+                [STORED_EVENT_TOPIC],
+                self.block_number + 1,
+                block_number,
+            )
+            for log in logs:
+                key = self.contract.events.Stored().process_log(log)['args']['key']
+                logger.debug(f"Map key {key} changed in block {log['blockNumber']}")
+                self._cache.pop(key, None)
+        self.block_number = block_number
+
+    def _cached(self, key: str) -> str | None:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        value, fetched_at = entry
+        if time.monotonic() - fetched_at > self.ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return value
+
+    def _put(self, key: str, value: str) -> None:
+        self._cache[key] = (value, time.monotonic())
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def get(self, key: str) -> str:
+        """Return the value of `key`, empty if the key is not set."""
+        with self._lock:
+            self._poll()
+            value = self._cached(key)
+            if value is None:
+                value = self.contract.functions.value(key).call(block_identifier=self.block_number)
+                self._put(key, value)
+            return value
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        """Return the values of `keys`, reading all keys missing from the cache with a single batch request."""
+        with self._lock:
+            self._poll()
+            values = {}
+            missing = []
+            for key in keys:
+                value = self._cached(key)
+                if value is None:
+                    missing.append(key)
+                else:
+                    values[key] = value
+
+            if missing:
+                with self.w3.batch_requests() as batch:
+                    for key in missing:
+                        batch.add(self.contract.functions.value(key).call(block_identifier=self.block_number))
+                    results = batch.execute()
+                for key, value in zip(missing, results):
+                    self._put(key, value)
+                    values[key] = value
+            return {key: values[key] for key in keys}
@@ -0,0 +1,98 @@
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Iterator
+
+
+# magic, version, block number the snapshot was taken at, number of pairs
+SNAPSHOT_MAGIC = b'RMAP'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('>4sBQI')
+# key offset, key length, value offset, value length; offsets are relative to the start of the data section
+SNAPSHOT_ENTRY = struct.Struct('>IIII')
+
+
+def write_snapshot(path: str | Path, block_number: int, items: dict[str, str]) -> None:
+    """Write `items` to a snapshot file at `path`, atomically replacing any previous snapshot.
+
+    The file consists of a header, a table of fixed size entries sorted by key and a data section with
+    the UTF-8 encoded keys and values, so it can be memory mapped and searched without parsing it first.
+    """
+    encoded = sorted((key.encode(), value.encode()) for key, value in items.items())
+    entries = []
+    data = bytearray()
+    for key, value in encoded:
+        entries.append(SNAPSHOT_ENTRY.pack(len(data), len(key), len(data) + len(key), len(value)))
+        data += key + value
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, block_number, len(entries)))
+        f.write(b''.join(entries))
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class MapSnapshot:
+    """Read-only, memory mapped view of a snapshot file written by `write_snapshot`.
+
+    Lookups binary search the entry table, so opening even a large snapshot is instant and only the pages
+    that are actually used are read from disk.
+    """
+
+    def __init__(self, path: str | Path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.block_number, self._count = SNAPSHOT_HEADER.unpack_from(self._mmap)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a Map snapshot")
+        self._data_offset = SNAPSHOT_HEADER.size + self._count * SNAPSHOT_ENTRY.size
+
+    def __enter__(self) -> "MapSnapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _entry(self, index: int) -> tuple[int, int, int, int]:
+        return SNAPSHOT_ENTRY.unpack_from(self._mmap, SNAPSHOT_HEADER.size + index * SNAPSHOT_ENTRY.size)
+
+    def _key(self, index: int) -> bytes:
+        key_offset, key_size, _, _ = self._entry(index)
+        start = self._data_offset + key_offset
+        return self._mmap[start:start + key_size]
+
+    def _value(self, index: int) -> str:
+        _, _, value_offset, value_size = self._entry(index)
+        start = self._data_offset + value_offset
+        return self._mmap[start:start + value_size].decode()
+
+    def get(self, key: str, default: str | None = None) -> str | None:
+        """Return the value of `key`, `default` if the key was not set."""
+        encoded_key = key.encode()
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < encoded_key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._key(low) == encoded_key:
+            return self._value(low)
+        return default
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self._count):
+            yield self._key(index).decode()
+
+    def items(self) -> Iterator[tuple[str, str]]:
+        for index in range(self._count):
+            yield self._key(index).decode(), self._value(index)
@@ -0,0 +1,315 @@
+import collections
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+from common import clone_web3
+from web3 import Web3
+from web3.exceptions import BlockNotFound
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_CHUNK_SIZE = 16
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_REORG_DEPTH = 32
+DEFAULT_LOG_BLOCK_RANGE = 10000
+# block responses are hex strings only, so these can only match the JSON-RPC fields themselves
+RAW_ERROR_RESPONSE = re.compile(rb'"error"\s*:|"result"\s*:\s*null')
+
+
+class AdaptiveBatchSize:
+    """Number of blocks requested per JSON-RPC batch, shared by all fetch workers.
+
+    The size is halved whenever the node rejects or times out a batch and grows back by one block
+    after every successful batch, up to the configured maximum.
+    """
+
+    def __init__(self, maximum: int):
+        if maximum < 1:
+            raise ValueError(f"batch size must be positive, got {maximum}")
+        self.maximum = maximum
+        self._size = maximum
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def shrink(self, failed_size: int) -> None:
+        with self._lock:
+            self._size = max(1, min(self._size, failed_size // 2))
+
+    def grow(self) -> None:
+        with self._lock:
+            self._size = min(self.maximum, self._size + 1)
+
+
+class ScanCursor:
+    """Position of an incremental scan, persisted in a JSON file between runs.
+
+    Besides the last scanned block, the cursor keeps the hashes of the last `reorg_depth` scanned blocks.
+    When the chain no longer contains the last scanned block, the scan is resumed right after the newest
+    block that is still part of the chain, rewinding at most `reorg_depth` blocks.
+    """
+
+    def __init__(self, path: str | Path, reorg_depth: int = DEFAULT_REORG_DEPTH):
+        self.path = Path(path)
+        self.reorg_depth = reorg_depth
+        self.block_hashes: dict[int, str] = {}
+        if self.path.exists():
+            data = json.loads(self.path.read_text())
+            self.block_hashes = {int(number): block_hash for number, block_hash in data["block_hashes"].items()}
+
+    @property
+    def last_block(self) -> int | None:
+        """Number of the last scanned block, `None` if nothing was scanned yet."""
+        return max(self.block_hashes, default=None)
+
+    def advance(self, block) -> None:
+        """Record `block` as scanned."""
+        self.record(block.number, block.hash.to_0x_hex())
+
+    def record(self, block_number: int, block_hash: str) -> None:
+        """Record the block `block_number` with the 0x prefixed `block_hash` as scanned."""
+        self.block_hashes[block_number] = block_hash
+        oldest_kept = block_number - self.reorg_depth
+        for number in [number for number in self.block_hashes if number <= oldest_kept]:
+            del self.block_hashes[number]
+
+    def resume_block(self, w3: Web3) -> int | None:
+        """Return the first block that needs to be scanned, `None` if nothing was scanned yet.
+
+        Stored blocks that are no longer part of the chain are forgotten. If none of them is, the scan
+        is rewound to the oldest stored block.
+        """
+        oldest_block = min(self.block_hashes, default=None)
+        for number in sorted(self.block_hashes, reverse=True):
+            try:
+                chain_hash = w3.eth.get_block(number).hash.to_0x_hex()
+            except BlockNotFound:
+                chain_hash = None
+            if chain_hash == self.block_hashes[number]:
+                return number + 1
+            logger.warning(f"Block {number} was reorganized, rewinding the scan")
+            del self.block_hashes[number]
+        return oldest_block
+
+    def save(self) -> None:
+        """Atomically write the cursor to its file."""
+        data = {
+            "last_block": self.last_block,
+            "block_hashes": {str(number): block_hash for number, block_hash in sorted(self.block_hashes.items())},
+        }
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        temp_path.write_text(json.dumps(data, indent=2))
+        os.replace(temp_path, self.path)
+
+
+_thread_local = threading.local()
+
+
+def _batching_web3(w3: Web3) -> Web3:
+    """Return a per-thread clone of `w3` that can send batch requests without affecting other threads."""
+    cached = getattr(_thread_local, "web3", None)
+    if cached is None or cached[0] is not w3:
+        cached = (w3, clone_web3(w3))
+        _thread_local.web3 = cached
+    return cached[1]
+
+
+def split_range(start: int, end: int, chunk_size: int) -> Iterator[tuple[int, int]]:
+    """Split the inclusive block range ``[start, end]`` into inclusive chunks of at most ``chunk_size`` blocks."""
+    for chunk_start in range(start, end + 1, chunk_size):
+        yield chunk_start, min(chunk_start + chunk_size - 1, end)
+
+
+def fetch_blocks_batched(w3: Web3, start: int, end: int, batch_size: AdaptiveBatchSize) -> list:
+    """Fetch blocks ``[start, end]`` packing several ``eth_getBlockByNumber`` calls into each JSON-RPC batch.
+
+    A failed batch is retried with a smaller batch size; once the size drops to a single block,
+    blocks are requested one by one so that errors are reported as they are for unbatched requests.
+    """
+    batch_w3 = _batching_web3(w3)
+    blocks = []
+    block_number = start
+    while block_number <= end:
+        size = min(batch_size.size, end - block_number + 1)
+        if size == 1:
+            blocks.append(w3.eth.get_block(block_number, full_transactions=True))
+            block_number += 1
+            batch_size.grow()
+            continue
+
+        try:
+            with batch_w3.batch_requests() as batch:
+                for number in range(block_number, block_number + size):
+                    batch.add(batch_w3.eth.get_block(number, full_transactions=True))
+                batch_blocks = batch.execute()
+        except Exception as e:
+            logger.debug(f"Batch of {size} blocks from {block_number} failed, shrinking batch size: {e!r}")
+            batch_size.shrink(size)
+            continue
+
+        blocks.extend(batch_blocks)
+        block_number += size
+        batch_size.grow()
+    return blocks
+
+
+def fetch_blocks(w3: Web3, start: int, end: int, batch_size: AdaptiveBatchSize | None = None) -> list:
+    """Fetch blocks ``[start, end]`` with full transactions, in block order.
+
+    If `batch_size` is given, blocks are requested in JSON-RPC batches, otherwise one request is made per block.
+    """
+    if batch_size is not None:
+        return fetch_blocks_batched(w3, start, end, batch_size)
+    return [w3.eth.get_block(block_number, full_transactions=True) for block_number in range(start, end + 1)]
+
+
+def fetch_raw_blocks(w3: Web3, start: int, end: int, batch_size: AdaptiveBatchSize | None = None) -> list[bytes]:
+    """Fetch blocks ``[start, end]`` with full transactions as raw JSON-RPC response bodies, in block order.
+
+    Responses are neither decoded nor formatted by web3, so they can be handed to other processes as they are.
+    Each body holds the response to a single request, or to a batch of requests for consecutive blocks whose
+    responses may come in any order. Batches are shrunk on errors as in `fetch_blocks_batched`.
+    Requires a provider with `make_raw_request`, like the ones of `common.get_web3_connection`.
+    """
+    if not hasattr(w3.provider, "make_raw_batch_request"):
+        raise ValueError(f"{type(w3.provider).__name__} cannot return raw responses")
+    responses = []
+    block_number = start
+    while block_number <= end:
+        size = min(batch_size.size if batch_size else 1, end - block_number + 1)
+        if size == 1:
+            response = w3.provider.make_raw_request("eth_getBlockByNumber", [hex(block_number), True])
+            if RAW_ERROR_RESPONSE.search(response):
+                raise BlockNotFound(f"Block {block_number} could not be fetched: {response[:200]!r}")
+            responses.append(response)
+            block_number += 1
+            if batch_size:
+                batch_size.grow()
+            continue
+
+        batch_requests = [
+            ("eth_getBlockByNumber", [hex(number), True]) for number in range(block_number, block_number + size)
+        ]
+        try:
+            response = w3.provider.make_raw_batch_request(batch_requests)
+            if RAW_ERROR_RESPONSE.search(response):
+                raise ValueError(f"error in batch response: {response[:200]!r}")
+        except Exception as e:
+            logger.debug(f"Batch of {size} blocks from {block_number} failed, shrinking batch size: {e!r}")
+            batch_size.shrink(size)
+            continue
+
+        responses.append(response)
+        block_number += size
+        batch_size.grow()
+    return responses
+
+
+def iter_chunks(
+    fetch,
+    w3: Web3,
+    start: int,
+    end: int,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    batch_size: int | None = DEFAULT_BATCH_SIZE,
+) -> Iterator:
+    """Yield ``fetch(w3, chunk_start, chunk_end, batch_size)`` for chunks of ``[start, end]``, in block order.
+
+    Chunks are fetched concurrently, and at most ``2 * concurrency`` of them are held in memory, so arbitrarily
+    long ranges can be scanned. `batch_size` is passed to `fetch` as an `AdaptiveBatchSize` shared by all chunks,
+    or `None` when batching is disabled.
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be positive, got {concurrency}")
+    adaptive_batch_size = AdaptiveBatchSize(batch_size) if batch_size and batch_size > 1 else None
+
+    chunks = split_range(start, end, chunk_size)
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pending = collections.deque()
+    try:
+        for chunk_start, chunk_end in chunks:
+            pending.append(executor.submit(fetch, w3, chunk_start, chunk_end, adaptive_batch_size))
+            if len(pending) >= 2 * concurrency:
+                break
+
+        while pending:
+            result = pending.popleft().result()
+            next_chunk = next(chunks, None)
+            if next_chunk is not None:
+                pending.append(executor.submit(fetch, w3, *next_chunk, adaptive_batch_size))
+            yield result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_blocks(
+    w3: Web3,
+    start: int,
+    end: int,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    batch_size: int | None = DEFAULT_BATCH_SIZE,
+) -> Iterator:
+    """Yield blocks ``[start, end]`` in block order, fetching chunks of the range concurrently.
+
+    Args:
+        w3: Web3 instance
+        start: first block to fetch
+        end: last block to fetch (inclusive)
+        concurrency: maximum number of chunks fetched at the same time
+        chunk_size: number of consecutive blocks fetched by a single worker
+        batch_size: maximum number of blocks per JSON-RPC batch request, `None` or 1 to disable batching
+    Yields:
+        blocks with full transactions, ordered by block number
+
+    At most ``2 * concurrency`` chunks are held in memory, so arbitrarily long ranges can be scanned.
+    """
+    for blocks in iter_chunks(fetch_blocks, w3, start, end, concurrency, chunk_size, batch_size):
+        yield from blocks
+
+
+def iter_logs(
+    w3: Web3,
+    address: str,
+    topics: list,
+    start: int,
+    end: int,
+    block_range: int = DEFAULT_LOG_BLOCK_RANGE,
+) -> Iterator:
+    """Yield logs of `address` matching `topics` in blocks ``[start, end]``, in block order.
+
+    Logs are requested with ``eth_getLogs`` over ranges of up to `block_range` blocks. Nodes limit the size of
+    a single query in various ways, so whenever a query fails, the range is halved and the query retried.
+    The range doubles again after every successful query, up to `block_range`, so that a transient error does
+    not slow down the rest of a long scan.
+    """
+    range_size = block_range
+    from_block = start
+    while from_block <= end:
+        to_block = min(from_block + range_size - 1, end)
+        try:
+            logs = w3.eth.get_logs(
+                {"address": address, "topics": topics, "fromBlock": from_block, "toBlock": to_block}
+            )
+        except Exception as e:
+            if to_block == from_block:
+                raise
+            range_size = max(1, (to_block - from_block + 1) // 2)
+            logger.debug(f"Logs query for blocks {from_block}-{to_block} failed, shrinking range: {e!r}")
+            continue
+
+        range_size = min(block_range, range_size * 2)
+        yield from logs
+        from_block = to_block + 1
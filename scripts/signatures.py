@@ -0,0 +1,4 @@
+# Functions of the Checkpoint contracts whose calls are tracked, by the kind names used on the command line
+BOUNDED_SIGNATURE = 'checkpointBounded(bytes32)'
+UNBOUNDED_SIGNATURE = 'checkpointUnbounded(bytes)'
+SIGNATURES_BY_KIND = {'bounded': BOUNDED_SIGNATURE, 'unbounded': UNBOUNDED_SIGNATURE}
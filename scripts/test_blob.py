@@ -0,0 +1,40 @@
+import random
+
+from blob import CHUNK_HEADER, BlobAssembler, split_blob
+
+
+SENDER = '0x2222222222222222222222222222222222222222'
+
+
+def test_blob_roundtrip_out_of_order() -> None:
+    data = random.Random(0).randbytes(10_000)
+    chunks = split_blob(data, 1_000)
+    assert len(chunks) == 11
+    assert all(len(chunk) <= 1_000 for chunk in chunks)
+
+    assembler = BlobAssembler()
+    random.Random(1).shuffle(chunks)
+    results = [assembler.add(SENDER, block_number, chunk) for block_number, chunk in enumerate(chunks + chunks[:1])]
+    blobs = [blob for blob in results if blob is not None]
+    assert len(blobs) == 1
+    assert blobs[0].data == data
+    assert blobs[0].block_number == len(chunks) - 1
+
+
+def test_blob_chunks_are_grouped_by_sender() -> None:
+    chunks = split_blob(b'x' * 300, 100)
+    assembler = BlobAssembler()
+    assert assembler.add(SENDER, 1, chunks[0]) is None
+    assert all(assembler.add('0x' + '33' * 20, 2, chunk) is None for chunk in chunks[1:])
+    assert [assembler.add(SENDER, 3, chunk) for chunk in chunks[1:]][-1].data == b'x' * 300
+
+
+def test_blob_corrupted_chunk_is_rejected() -> None:
+    chunks = split_blob(b'some blob data' * 20, 100)
+    chunks[1] = chunks[1][:CHUNK_HEADER.size] + b'?' + chunks[1][CHUNK_HEADER.size + 1:]
+    assembler = BlobAssembler()
+    assert all(assembler.add(SENDER, 1, chunk) is None for chunk in chunks)
+
+
+def test_non_blob_payloads_are_ignored() -> None:
+    assert BlobAssembler().add(SENDER, 1, b'plain checkpoint data') is None
@@ -0,0 +1,88 @@
+import sys
+
+import pytest
+from web3 import Web3
+
+import checkpoint_index
+from checkpoint_index import CheckpointIndex, IndexedCall
+from signatures import BOUNDED_SIGNATURE, UNBOUNDED_SIGNATURE
+
+CONTRACT = Web3.to_checksum_address("0x" + "11" * 20)
+OTHER_CONTRACT = Web3.to_checksum_address("0x" + "22" * 20)
+ALICE = Web3.to_checksum_address("0x" + "aa" * 20)
+BOB = Web3.to_checksum_address("0x" + "bb" * 20)
+
+
+def indexed_call(block: int, tx_index: int, sender: str, contract: str = CONTRACT, signature=UNBOUNDED_SIGNATURE):
+    tx_hash = "0x" + f"{block:04x}{tx_index:02x}".rjust(64, "0")
+    return IndexedCall(block, tx_index, tx_hash, contract, signature, sender, f"{block}:{tx_index}".encode())
+
+
+CALLS = [
+    indexed_call(10, 0, ALICE),
+    indexed_call(10, 1, BOB),
+    indexed_call(12, 3, ALICE),
+    indexed_call(12, 1, ALICE),
+    indexed_call(13, 0, ALICE, contract=OTHER_CONTRACT),
+    indexed_call(14, 0, BOB, signature=BOUNDED_SIGNATURE),
+]
+
+
+@pytest.fixture
+def index():
+    with CheckpointIndex(":memory:") as index:
+        index.add_calls(CALLS)
+        yield index
+
+
+def test_latest_call_of_every_sender(index) -> None:
+    latest = index.latest_per_sender(CONTRACT, UNBOUNDED_SIGNATURE)
+    # the transaction index orders calls of the same block
+    assert latest == [indexed_call(12, 3, ALICE), indexed_call(10, 1, BOB)]
+    bounded_latest = index.latest_per_sender(CONTRACT, BOUNDED_SIGNATURE)
+    assert bounded_latest == [indexed_call(14, 0, BOB, signature=BOUNDED_SIGNATURE)]
+
+
+def test_calls_from_sender(index) -> None:
+    assert [(call.block, call.tx_index) for call in index.calls_from(ALICE)] == [(10, 0), (12, 1), (12, 3), (13, 0)]
+    assert [(call.block, call.tx_index) for call in index.calls_from(ALICE, 11, 12)] == [(12, 1), (12, 3)]
+    assert [call.contract for call in index.calls_from(ALICE, start_block=12, contract=OTHER_CONTRACT)] == [
+        OTHER_CONTRACT
+    ]
+    assert index.calls_from(ALICE, end_block=9) == []
+
+
+def test_remove_from_block(index) -> None:
+    assert index.last_block(CONTRACT, UNBOUNDED_SIGNATURE) == 12
+    index.remove_from_block(CONTRACT, UNBOUNDED_SIGNATURE, 11)
+    assert index.last_block(CONTRACT, UNBOUNDED_SIGNATURE) == 10
+    # calls of other contracts and functions are kept
+    assert [(call.block, call.contract) for call in index.calls_from(ALICE)] == [(10, CONTRACT), (13, OTHER_CONTRACT)]
+    assert index.last_block(CONTRACT, BOUNDED_SIGNATURE) == 14
+    assert index.last_block(OTHER_CONTRACT, BOUNDED_SIGNATURE) is None
+
+    # indexing the rescanned blocks again does not duplicate calls
+    index.add_calls(CALLS)
+    index.add_calls(CALLS)
+    assert len(index.calls_from(ALICE)) == 4
+
+
+def test_cli(tmp_path, monkeypatch, capsys) -> None:
+    path = tmp_path / "index.sqlite"
+    with CheckpointIndex(path) as index:
+        index.add_calls(CALLS)
+
+    monkeypatch.setattr(sys, "argv", ["checkpoint_index.py", str(path), "latest", CONTRACT.lower(), "unbounded"])
+    checkpoint_index.main()
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "block,tx_hash,contract,sender,argument"
+    assert [line.split(",")[0] for line in lines[1:]] == ["12", "10"]
+
+    argv = ["checkpoint_index.py", str(path), "sender", ALICE.lower(), "--from-block", "12", "--to-block", "12"]
+    monkeypatch.setattr(sys, "argv", argv)
+    checkpoint_index.main()
+    rows = [line.split(",") for line in capsys.readouterr().out.splitlines()[1:]]
+    assert rows == [
+        ["12", call.tx_hash, CONTRACT, ALICE, call.payload.hex()]
+        for call in (indexed_call(12, 1, ALICE), indexed_call(12, 3, ALICE))
+    ]
@@ -0,0 +1,42 @@
+import json
+import random
+
+from codec import CODEC_MAGIC, decode_payload, encode_payload
+
+
+def test_compressible_payload_roundtrip() -> None:
+    data = json.dumps({"weights": {str(uid): uid / 7 for uid in range(256)}}).encode()
+    encoded = encode_payload(data)
+    assert encoded.startswith(CODEC_MAGIC)
+    assert len(encoded) < len(data) // 2
+    assert decode_payload(encoded) == data
+
+
+def test_incompressible_payload_is_stored_as_is() -> None:
+    data = random.Random(0).randbytes(100)
+    assert not data.startswith(CODEC_MAGIC)
+    assert encode_payload(data) == data
+    assert decode_payload(data) == data
+
+
+def test_payload_resembling_header_is_wrapped() -> None:
+    data = CODEC_MAGIC + b'\x01not compressed'
+    encoded = encode_payload(data)
+    assert encoded != data
+    assert decode_payload(encoded) == data
+    # undecodable payloads are returned unchanged
+    assert decode_payload(data) == data
+
+
+def test_fixed_size_payload_roundtrip() -> None:
+    data = b'\x01' * 64
+    encoded = encode_payload(data, size=32)
+    assert len(encoded) == 32
+    assert decode_payload(encoded, fixed_size=True) == data
+    assert encode_payload(b'abc', size=32) == b'abc'.rjust(32, b'\0')
+
+
+def test_unencoded_payload_with_raw_header_is_kept() -> None:
+    # stored without this module, looks like a raw codec header after the zero padding
+    legacy = CODEC_MAGIC.rjust(29, b'\0') + b'\x00ab'
+    assert decode_payload(legacy, fixed_size=True) == legacy
@@ -0,0 +1,248 @@
+import http.server
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+from eth_account import Account
+from web3 import Web3
+from web3.exceptions import TimeExhausted, TransactionNotFound, Web3RPCError
+
+from common import (
+    ARCHIVE_RECHECK_INTERVAL,
+    InstrumentedHTTPProvider,
+    PooledHTTPProvider,
+    RetryableRPCError,
+    RPCStats,
+    TransactionReplaced,
+    TransactionSender,
+)
+
+
+class FakeFunctionCall:
+    def build_transaction(self, transaction: dict) -> dict:
+        return {**transaction, 'to': '0x' + '11' * 20, 'data': '0x'}
+
+
+class FakeEth:
+    """Chain that never mines anything, optionally with the account's nonces used by other transactions."""
+
+    chain_id = 1
+    gas_price = 10
+
+    def __init__(self, mined_nonce: int = 0):
+        self.account = self
+        self.mined_nonce = mined_nonce
+        self.signed = []
+        self.sent = []
+
+    def sign_transaction(self, transaction: dict, private_key):
+        self.signed.append(transaction)
+        return Account.sign_transaction(transaction, private_key)
+
+    def get_transaction_count(self, address, block_identifier='latest'):
+        return self.mined_nonce
+
+    def send_raw_transaction(self, raw_transaction):
+        self.sent.append(Account.recover_transaction(raw_transaction))
+        return bytes([len(self.sent)]) * 32
+
+    def wait_for_transaction_receipt(self, tx_hash, timeout):
+        raise TimeExhausted("not mined")
+
+    def get_transaction_receipt(self, tx_hash):
+        raise TransactionNotFound("not found")
+
+
+def test_stuck_transaction_is_rebroadcast_with_higher_gas_price() -> None:
+    eth = FakeEth()
+    with TransactionSender(SimpleNamespace(eth=eth), Account.create(), receipt_timeout=0, rebroadcasts=2) as sender:
+        future = sender.send(FakeFunctionCall())
+        with pytest.raises(TimeExhausted):
+            future.result()
+    assert len(eth.sent) == 3
+    gas_prices = [transaction['gasPrice'] for transaction in eth.signed]
+    assert gas_prices == sorted(set(gas_prices))
+
+
+def test_replaced_transaction() -> None:
+    eth = FakeEth()
+    with TransactionSender(SimpleNamespace(eth=eth), Account.create(), receipt_timeout=0) as sender:
+        eth.mined_nonce = 1
+        future = sender.send(FakeFunctionCall())
+        with pytest.raises(TransactionReplaced):
+            future.result()
+
+
+class RPCHandler(http.server.BaseHTTPRequestHandler):
+    """JSON-RPC node knowing only `eth_blockNumber` and `eth_getBalance`.
+
+    The first `rate_limited` requests are answered with HTTP `rate_limit_status`, and without `archive`, balances can only be read
+    at the latest block.
+    """
+
+    rate_limited = 0
+    rate_limit_status = 429
+    archive = True
+    requests = 0
+
+    def respond(self, request: dict) -> dict:
+        if request["method"] == "eth_blockNumber":
+            return {"jsonrpc": "2.0", "id": request["id"], "result": "0x10"}
+        if request["method"] == "eth_getBalance" and (self.archive or request["params"][1] == "latest"):
+            return {"jsonrpc": "2.0", "id": request["id"], "result": "0x1"}
+        if request["method"] == "eth_getBalance":
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32000, "message": "missing trie node"}}
+        return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": "method not found"}}
+
+    def do_POST(self) -> None:
+        type(self).requests += 1
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if type(self).rate_limited > 0:
+            type(self).rate_limited -= 1
+            self.send_response(self.rate_limit_status)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if isinstance(request, list):
+            body = json.dumps([self.respond(r) for r in request]).encode()
+        else:
+            body = json.dumps(self.respond(request)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def rpc_server():
+    """Start fake RPC nodes, each with its own `RPCHandler` subclass to configure, and return their URLs."""
+    servers = []
+
+    def start(**attributes) -> tuple[str, type[RPCHandler]]:
+        handler = type("Handler", (RPCHandler,), attributes)
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}", handler
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def rpc_url(rpc_server):
+    return rpc_server()[0]
+
+
+def unused_url() -> str:
+    server = http.server.HTTPServer(("127.0.0.1", 0), RPCHandler)
+    server.server_close()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def test_rpc_requests_are_recorded(rpc_url, tmp_path) -> None:
+    stats = RPCStats()
+    w3 = Web3(InstrumentedHTTPProvider(rpc_url, stats))
+    assert w3.eth.block_number == 16
+    with pytest.raises(Web3RPCError):
+        w3.eth.chain_id
+    with w3.batch_requests() as batch:
+        batch.add(w3.eth.get_block_number())
+        batch.add(w3.eth.get_block_number())
+        batch.execute()
+
+    methods = stats.as_dict()
+    assert methods["eth_blockNumber"]["calls"] == 1
+    assert methods["eth_blockNumber"]["batched_calls"] == 2
+    assert methods["eth_blockNumber"]["bytes_received"] > 0
+    assert methods["eth_chainId"]["errors"] == 1
+    assert methods["batch"]["calls"] == 1
+    assert sum(methods["batch"]["latency_buckets"].values()) == 1
+
+    stats.dump(tmp_path / "stats.json")
+    assert json.loads((tmp_path / "stats.json").read_text()) == methods
+    stats.dump(tmp_path / "stats.prom")
+    assert 'rpc_latency_seconds_bucket{method="batch",le="+Inf"} 1' in (tmp_path / "stats.prom").read_text()
+
+
+def test_rate_limited_requests_are_retried(rpc_server) -> None:
+    url, handler = rpc_server(rate_limited=2)
+    stats = RPCStats()
+    w3 = Web3(PooledHTTPProvider([url], stats))
+    assert w3.eth.block_number == 16
+    assert handler.requests == 3
+    assert stats.as_dict()["eth_blockNumber"]["retries"] == 2
+
+
+def test_unreachable_endpoint_is_avoided(rpc_server) -> None:
+    url, handler = rpc_server()
+    provider = PooledHTTPProvider([unused_url(), url], RPCStats(), backoff=60)
+    w3 = Web3(provider)
+    for _ in range(3):
+        assert w3.eth.block_number == 16
+    assert handler.requests == 3
+    assert provider.endpoints[0].failures == 1
+    assert provider.endpoints[1].latency is not None
+
+
+def test_old_state_is_read_from_archive_endpoints(rpc_server) -> None:
+    pruned_url, pruned_handler = rpc_server(archive=False)
+    archive_url, archive_handler = rpc_server(archive=True)
+    provider = PooledHTTPProvider([pruned_url, archive_url], RPCStats())
+    w3 = Web3(provider)
+    address = "0x" + "11" * 20
+    assert w3.eth.get_balance(address, block_identifier=1) == 1
+    assert w3.eth.get_balance(address, block_identifier=2) == 1
+    assert not provider.endpoints[0].archive
+    assert pruned_handler.requests == 1
+    assert archive_handler.requests == 2
+    # recent state can be read from any endpoint
+    assert w3.eth.get_balance(address) == 1
+    # the endpoint may only have been lagging behind, so it is asked again after a while
+    provider.endpoints[0].pruned_until -= ARCHIVE_RECHECK_INTERVAL
+    assert provider.endpoints[0].archive
+
+
+def test_transactions_are_only_retried_when_not_received(rpc_server) -> None:
+    rate_limited_url, rate_limited_handler = rpc_server(rate_limited=1)
+    provider = PooledHTTPProvider([rate_limited_url], RPCStats())
+    provider.make_request("eth_sendRawTransaction", ["0x00"])
+    assert rate_limited_handler.requests == 2
+
+    # a gateway timeout does not tell whether the node got the transaction
+    gateway_url, gateway_handler = rpc_server(rate_limited=1, rate_limit_status=504)
+    provider = PooledHTTPProvider([gateway_url], RPCStats())
+    with pytest.raises(RetryableRPCError):
+        provider.make_request("eth_sendRawTransaction", ["0x00"])
+    assert gateway_handler.requests == 1
+    assert provider.make_request("eth_blockNumber", [])["result"] == "0x10"
+
+
+class RaceEth(FakeEth):
+    """Chain on which the first broadcast is mined right after its receipt was looked for."""
+
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+
+    def get_transaction_receipt(self, tx_hash):
+        self.lookups += 1
+        if self.lookups == 1:
+            self.mined_nonce = 1
+            raise TransactionNotFound("not found")
+        return {'transactionHash': tx_hash, 'status': 1}
+
+
+def test_transaction_mined_while_checking_is_not_replaced() -> None:
+    eth = RaceEth()
+    with TransactionSender(SimpleNamespace(eth=eth), Account.create(), receipt_timeout=0) as sender:
+        receipt = sender.send(FakeFunctionCall()).result()
+    assert receipt['transactionHash'] == bytes([1]) * 32
+    assert len(eth.sent) == 1
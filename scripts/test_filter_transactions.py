@@ -0,0 +1,162 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+
+import filter_transactions
+from filter_transactions import (
+    BOUNDED_SIGNATURE,
+    UNBOUNDED_SIGNATURE,
+    CallSink,
+    ScanTarget,
+    decode_payloads,
+    decode_unbounded_payload,
+    iter_logged_checkpoints,
+    iter_target_calls,
+    truncate_output,
+)
+from scanner import ScanCursor
+
+
+UNBOUNDED_SELECTOR = Web3.keccak(text=UNBOUNDED_SIGNATURE)[:4]
+
+
+def test_decode_unbounded_payload() -> None:
+    payloads = [b'', b'\x01', b'\x00' * 31 + b'\x01', b'x' * 32, b'data that spans multiple words' * 5]
+    call_inputs = [UNBOUNDED_SELECTOR + encode(['bytes'], [payload]) for payload in payloads]
+    assert decode_payloads(UNBOUNDED_SIGNATURE, call_inputs) == payloads
+
+
+def test_decode_unbounded_payload_non_canonical_offset() -> None:
+    # offset pointing past an unused word
+    call_input = UNBOUNDED_SELECTOR + encode(['uint256', 'uint256', 'uint256'], [64, 0, 3]) + b'abc'.ljust(32, b'\0')
+    assert decode_unbounded_payload(call_input) == b'abc'
+
+
+def test_decode_unbounded_payload_malformed() -> None:
+    call_input = UNBOUNDED_SELECTOR + encode(['bytes'], [b'payload'])
+    assert decode_unbounded_payload(call_input[:40]) is None  # truncated length word
+    assert decode_unbounded_payload(UNBOUNDED_SELECTOR + encode(['uint256'], [2**255])) is None  # offset out of range
+    assert decode_unbounded_payload(UNBOUNDED_SELECTOR + encode(['uint256', 'uint256'], [32, 10])) is None
+
+
+def test_decode_bounded_payload() -> None:
+    selector = Web3.keccak(text=BOUNDED_SIGNATURE)[:4]
+    payload = bytes(range(32))
+    assert decode_payloads(BOUNDED_SIGNATURE, [selector + payload, selector + payload[:5]]) == [payload, None]
+
+
+def test_scan_targets_in_one_pass(monkeypatch) -> None:
+    first, second = Web3.to_checksum_address("0x" + "11" * 20), Web3.to_checksum_address("0x" + "22" * 20)
+    bounded_selector = Web3.keccak(text=BOUNDED_SIGNATURE)[:4]
+    unbounded_input = UNBOUNDED_SELECTOR + encode(['bytes'], [b'unbounded'])
+    bounded_input = bounded_selector + b'bounded'.rjust(32, b'\0')
+    transactions = [
+        (first, unbounded_input),
+        (second, unbounded_input),  # not a target
+        (second, bounded_input),
+        (first, bounded_input),
+        (None, bounded_input),  # contract creation
+    ]
+    block = SimpleNamespace(number=7, transactions=[
+        {'to': to, 'input': HexBytes(call_input), 'hash': HexBytes(bytes([i]) * 32), 'transactionIndex': i, 'from': to}
+        for i, (to, call_input) in enumerate(transactions)
+    ])
+    fetched = []
+
+    def iter_blocks(w3, start, end, *args):
+        fetched.append((start, end))
+        return [block]
+
+    monkeypatch.setattr(filter_transactions, "iter_blocks", iter_blocks)
+
+    targets = [
+        ScanTarget(first, UNBOUNDED_SIGNATURE),
+        ScanTarget(first.lower(), BOUNDED_SIGNATURE),
+        ScanTarget(second, BOUNDED_SIGNATURE),
+    ]
+    calls = [(target, call.tx_index, call.payload) for target, call in iter_target_calls(None, targets, 7, 7)]
+    assert calls == [
+        (targets[0], 0, b'unbounded'),
+        (targets[2], 2, b'bounded'.rjust(32, b'\0')),
+        (targets[1], 3, b'bounded'.rjust(32, b'\0')),
+    ]
+    assert fetched == [(7, 7)]
+
+
+class RawBlocksProvider:
+    """Provider of raw blocks with a single unbounded call of `contract` in every block, batch responses reversed."""
+
+    def __init__(self, contract: str):
+        self.contract = contract
+
+    def block(self, number: int) -> dict:
+        call_input = UNBOUNDED_SELECTOR + encode(['bytes'], [number.to_bytes(2, 'big')])
+        transactions = [
+            {'to': None, 'input': '0x6080', 'hash': '0x' + 'aa' * 32, 'transactionIndex': '0x0', 'from': self.contract},
+            {
+                'to': self.contract.lower(),
+                'input': '0x' + call_input.hex(),
+                'hash': '0x' + bytes([number]).hex() * 32,
+                'transactionIndex': '0x1',
+                'from': '0x' + '33' * 20,
+            },
+        ]
+        return {'number': hex(number), 'hash': '0x' + bytes([number]).hex() * 32, 'transactions': transactions}
+
+    def make_raw_request(self, method, params) -> bytes:
+        return json.dumps({'jsonrpc': '2.0', 'id': 0, 'result': self.block(int(params[0], 16))}).encode()
+
+    def make_raw_batch_request(self, batch_requests) -> bytes:
+        responses = [
+            {'jsonrpc': '2.0', 'id': i, 'result': self.block(int(params[0], 16))}
+            for i, (method, params) in enumerate(batch_requests)
+        ]
+        return json.dumps(responses[::-1]).encode()
+
+
+def test_scan_in_processes(tmp_path) -> None:
+    contract = Web3.to_checksum_address("0x" + "11" * 20)
+    w3 = SimpleNamespace(provider=RawBlocksProvider(contract))
+    cursor = ScanCursor(tmp_path / "cursor.json")
+    targets = [ScanTarget(contract, UNBOUNDED_SIGNATURE)]
+    calls = list(iter_target_calls(w3, targets, 1, 40, chunk_size=4, batch_size=3, cursor=cursor, processes=2))
+    assert [call.payload for _, call in calls] == [number.to_bytes(2, 'big') for number in range(1, 41)]
+    sender = Web3.to_checksum_address("0x" + "33" * 20)
+    assert all(target == targets[0] and call.sender == sender for target, call in calls)
+    assert cursor.last_block == 40
+
+
+def test_logs_scan_resumes_before_reorganized_blocks(tmp_path, chain) -> None:
+    cursor = ScanCursor(tmp_path / "cursor.json", reorg_depth=20)
+    contract = Web3.to_checksum_address("0x" + "11" * 20)
+    assert list(iter_logged_checkpoints(chain, contract, UNBOUNDED_SIGNATURE, 100, 200, 10, cursor)) == []
+    assert sorted(cursor.block_hashes) == list(range(181, 201))
+
+    chain.reorganize(190)
+    assert cursor.resume_block(chain) == 190
+
+
+def test_appending_with_different_columns_is_refused(tmp_path) -> None:
+    output_file = tmp_path / "transactions.csv"
+    target = ScanTarget("0x" + "11" * 20, UNBOUNDED_SIGNATURE)
+    CallSink(target, output_file, 'w').close()
+
+    CallSink(target, output_file, 'a').close()
+    with pytest.raises(ValueError):
+        CallSink(target, output_file, 'a', hotkey_index={})
+    assert output_file.read_text().splitlines() == ['block,sender,argument']
+
+
+def test_truncate_output_drops_rows_from_first_block(tmp_path) -> None:
+    output_file = tmp_path / "transactions.csv"
+    output_file.write_text("block,sender,argument\r\n9,0x1,a\r\n10,0x2,b\r\n10,0x3,c\r\n11,0x4,d\r\n")
+
+    truncate_output(output_file, 12)
+    assert len(output_file.read_text().splitlines()) == 5
+
+    truncate_output(output_file, 10)
+    assert output_file.read_text().splitlines() == ['block,sender,argument', '9,0x1,a']
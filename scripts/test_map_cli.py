@@ -0,0 +1,295 @@
+import datetime
+import hashlib
+import http.server
+import json
+import threading
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+import map_cli
+from map_cli import ConfigCache, ConfigSyncer, split_store_batches, store_many_gas_limit, store_values
+
+
+def test_store_batches_fit_into_gas_budget() -> None:
+    items = {f"key{i}": "value" * i for i in range(50)}
+    batches = split_store_batches(items, 1000000)
+    assert len(batches) > 1
+    assert all(store_many_gas_limit(batch) <= 1000000 for batch in batches)
+    # order of the pairs is kept, so a later value of a key still wins
+    assert [key for batch in batches for key in batch] == list(items)
+
+
+def test_oversized_pair_gets_its_own_batch() -> None:
+    items = {"small": "1", "large": "x" * 10000, "other": "2"}
+    assert split_store_batches(items, 200000) == [{"small": "1"}, {"large": "x" * 10000}, {"other": "2"}]
+
+
+class FakeContract:
+    """Map contract whose function calls are just their names and arguments."""
+
+    functions = SimpleNamespace(
+        store=lambda key, value: ("store", [key], [value]),
+        storeMany=lambda keys, values: ("storeMany", keys, values),
+    )
+
+
+class FakeSender:
+    """`TransactionSender` failing transactions that store a key starting with "unsent", "lost" or "reverted".
+
+    Transactions of "unsent" keys fail to be sent, ones of "lost" keys fail waiting for their receipt
+    and ones of "reverted" keys are mined with a failed status.
+    """
+
+    instances: list["FakeSender"] = []
+
+    def __init__(self, w3, account, max_in_flight: int = 1):
+        self.max_in_flight = max_in_flight
+        self.sent = []
+        self.instances.append(self)
+
+    def __enter__(self) -> "FakeSender":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def send(self, function_call, gas_limit: int) -> Future:
+        name, keys, values = function_call
+        if any(key.startswith("unsent") for key in keys):
+            raise ConnectionError("node unavailable")
+        self.sent.append((name, keys, values, gas_limit))
+        future = Future()
+        if any(key.startswith("lost") for key in keys):
+            future.set_exception(TimeoutError("receipt not found"))
+        else:
+            status = 0 if any(key.startswith("reverted") for key in keys) else 1
+            future.set_result({"status": status, "transactionHash": bytes(32)})
+        return future
+
+
+@pytest.fixture
+def fake_sender(monkeypatch):
+    FakeSender.instances = []
+    monkeypatch.setattr(map_cli, "TransactionSender", FakeSender)
+    monkeypatch.setattr(map_cli, "get_map_contract", lambda w3, address: FakeContract())
+    return FakeSender
+
+
+def test_concurrent_store_counts_failed_transactions(fake_sender) -> None:
+    changes = {key: ("1", "") for key in ("ok", "unsent", "lost", "reverted", "other")}
+    syncer = ConfigSyncer(None, None, "0x" + "11" * 20, concurrent=True)
+
+    assert syncer.store(changes) == {"ok", "other"}
+    assert syncer.stats["stored"] == 2
+    assert syncer.stats["failed"] == 3
+    [sender] = fake_sender.instances
+    # all transactions are sent without waiting for each other
+    assert sender.max_in_flight == len(changes)
+    assert [(name, keys) for name, keys, _, _ in sender.sent] == [
+        ("store", ["ok"]),
+        ("store", ["lost"]),
+        ("store", ["reverted"]),
+        ("store", ["other"]),
+    ]
+
+
+def test_batched_store_counts_failed_keys(fake_sender) -> None:
+    keys = ["ok0", "ok1", "unsent0", "ok2", "lost0", "ok3", "reverted0", "ok4", "ok5", "ok6"]
+    changes = {key: ("value", "") for key in keys}
+    # room for two pairs per transaction
+    budget = store_many_gas_limit({"reverted0": "value", "reverted1": "value"})
+    syncer = ConfigSyncer(None, None, "0x" + "11" * 20, max_gas_per_transaction=budget)
+
+    assert syncer.store(changes) == {"ok0", "ok1", "ok5", "ok6"}
+    # every key of a failed batch is counted
+    assert syncer.stats["stored"] == 4
+    assert syncer.stats["failed"] == 6
+    [sender] = fake_sender.instances
+    assert sender.max_in_flight == 1
+    assert [(name, keys) for name, keys, _, _ in sender.sent] == [
+        ("storeMany", ["ok0", "ok1"]),
+        ("storeMany", ["lost0", "ok3"]),
+        ("storeMany", ["reverted0", "ok4"]),
+        ("storeMany", ["ok5", "ok6"]),
+    ]
+    assert all(gas_limit <= budget for _, _, _, gas_limit in sender.sent)
+
+
+def test_store_values_returns_receipt_of_each_batch(fake_sender) -> None:
+    items = {f"key{i}": "value" for i in range(5)}
+    budget = store_many_gas_limit({"key0": "value", "key1": "value"})
+
+    receipts = store_values(None, None, "0x" + "11" * 20, items, budget)
+    assert [receipt["status"] for receipt in receipts] == [1, 1, 1]
+    assert [keys for _, keys, _, _ in fake_sender.instances[0].sent] == [
+        ["key0", "key1"], ["key2", "key3"], ["key4"],
+    ]
+
+    with pytest.raises(TimeoutError):
+        store_values(None, None, "0x" + "11" * 20, {"key": "value", "lost": "value"}, budget)
+
+
+class ConfigHandler(http.server.BaseHTTPRequestHandler):
+    body = b""
+    requests = 0
+
+    def do_GET(self) -> None:
+        type(self).requests += 1
+        etag = '"' + hashlib.sha256(self.body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def config_url():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ConfigHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/config.json"
+    server.shutdown()
+
+
+def test_unchanged_config_is_not_synced_again(tmp_path, monkeypatch, config_url) -> None:
+    an_hour_ago = datetime.datetime.now(datetime.UTC) - datetime.timedelta(hours=1)
+    ConfigHandler.body = json.dumps({
+        "key": {
+            "description": "",
+            "items": [
+                {"value": 1},
+                {"value": 2, "effective_from": (an_hour_ago + datetime.timedelta(minutes=30)).isoformat()},
+            ],
+        },
+    }).encode()
+    reads = []
+    monkeypatch.setattr(map_cli, "read_values", lambda w3, address, keys: reads.append(keys) or ["2"])
+    cache = ConfigCache(tmp_path)
+    syncer = ConfigSyncer(None, None, "0x" + "11" * 20, cache=cache)
+
+    syncer.sync_config_from_urls([config_url])
+    assert reads == [["key"]]
+    assert syncer.stats["unchanged"] == 1
+
+    syncer.sync_config_from_urls([config_url])
+    assert len(reads) == 1
+    assert ConfigHandler.requests == 2
+
+    # an item became effective since the last sync
+    config_hashes = cache.get_sync_state(syncer.contract_address)["config_hashes"]
+    cache.put_sync_state(syncer.contract_address, an_hour_ago, config_hashes)
+    syncer.sync_config_from_urls([config_url])
+    assert len(reads) == 2
+
+
+def test_due_items_are_activated_without_full_sync(monkeypatch) -> None:
+    now = datetime.datetime.now(datetime.UTC)
+    in_a_moment = now + datetime.timedelta(milliseconds=200)
+    configs = {
+        "scheduled": {
+            "description": "",
+            "items": [{"value": 1}, {"value": 2, "effective_from": in_a_moment.isoformat()}],
+        },
+        "static": {"description": "", "items": [{"value": 3}]},
+    }
+    monkeypatch.setattr(map_cli, "read_values", lambda w3, address, keys: ["" for _ in keys])
+    syncer = ConfigSyncer(None, None, "0x" + "11" * 20)
+    syncer.fetch_configs = lambda urls: [configs]
+    stored = []
+    syncer.store = lambda changes: stored.append(changes) or set(changes)
+
+    syncer.sync_config_from_urls(["config.json"])
+    assert stored == [{"scheduled": ("1", ""), "static": ("3", "")}]
+    assert syncer.get_next_boundary(now) == in_a_moment
+    assert syncer.get_next_boundary(in_a_moment) is None
+
+    while datetime.datetime.now(datetime.UTC) < in_a_moment:
+        time.sleep(0.05)
+    syncer.activate_due_items()
+    assert stored[1] == {"scheduled": ("2", "1")}
+
+
+def test_prune_keeps_keys_that_are_configured(monkeypatch) -> None:
+    tomorrow = datetime.datetime.now(datetime.UTC) + datetime.timedelta(days=1)
+    configs = {
+        "valid": {"description": "", "items": [{"value": 1}]},
+        "invalid": {"items": "not a list"},
+        "scheduled": {"description": "", "items": [{"value": 2, "effective_from": tomorrow.isoformat()}]},
+    }
+    map_items = {"valid": "1", "invalid": "5", "scheduled": "6", "removed": "7"}
+    monkeypatch.setattr(map_cli, "read_entries", lambda w3, address: map_items)
+    syncer = ConfigSyncer(None, None, "0x" + "11" * 20, prune=True)
+    syncer.fetch_configs = lambda urls: [configs]
+    stored = []
+    syncer.store = lambda changes: stored.append(changes) or set(changes)
+
+    syncer.sync_config_from_urls(["config.json"])
+    assert stored == [{"removed": ("", "7")}]
+
+
+class FakeClock:
+    """Clock whose time only passes when sleeping, stopping the daemon once `limit` seconds passed."""
+
+    def __init__(self, limit: float):
+        self.start = datetime.datetime.now(datetime.UTC)
+        self.time = 0.0
+        self.limit = limit
+
+    def monotonic(self) -> float:
+        return self.time
+
+    def now(self) -> datetime.datetime:
+        return self.start + datetime.timedelta(seconds=self.time)
+
+    def sleep(self, seconds: float) -> None:
+        self.time += seconds
+        if self.time > self.limit:
+            raise KeyboardInterrupt
+
+
+def test_daemon_retries_failed_stores(monkeypatch) -> None:
+    clock = FakeClock(limit=1000)
+    monkeypatch.setattr(map_cli, "time", SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep))
+    monkeypatch.setattr(map_cli, "utc_now", clock.now)
+    monkeypatch.setattr(map_cli, "read_values", lambda w3, address, keys: ["" for _ in keys])
+    configs = {
+        "static": {"description": "", "items": [{"value": 1}]},
+        "scheduled": {
+            "description": "",
+            "items": [{"value": 2, "effective_from": (clock.start + datetime.timedelta(seconds=300)).isoformat()}],
+        },
+    }
+    syncer = ConfigSyncer(None, None, "0x" + "11" * 20)
+    syncer.fetch_configs = lambda urls: [configs]
+    stored = []
+
+    def store(changes):
+        stored.append((clock.time, changes))
+        if len(stored) == 1:
+            raise RuntimeError("node unavailable")
+        if len(stored) == 2:
+            return set()  # the transaction failed
+        return set(changes)
+
+    syncer.store = store
+    with pytest.raises(KeyboardInterrupt):
+        syncer.run_daemon(["config.json"], refresh_interval=3600)
+
+    assert stored == [
+        (0, {"static": ("1", "")}),
+        # the whole sync is retried after the first backoff
+        (60, {"static": ("1", "")}),
+        # only the failed key is stored again, after a longer backoff
+        (180, {"static": ("1", "")}),
+        (300, {"scheduled": ("2", "")}),
+    ]
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import map_client
+from map_client import MapClient
+
+
+class FakeMap:
+    """Map contract and chain: `values` is the contract state, `stored` the keys changed in every block."""
+
+    def __init__(self):
+        self.values = {}
+        self.stored = {}
+        self.block_number = 0
+        self.calls = 0
+        self.address = '0x' + '11' * 20
+        self.functions = SimpleNamespace(value=self._value)
+        self.events = SimpleNamespace(Stored=lambda: SimpleNamespace(process_log=lambda log: log))
+        self.eth = self
+
+    def _value(self, key):
+        def call(block_identifier):
+            self.calls += 1
+            return self.values.get(key, "")
+        return SimpleNamespace(call=call)
+
+    def store(self, key, value):
+        self.block_number += 1
+        self.values[key] = value
+        self.stored[self.block_number] = key
+
+    def get_logs(self, filter_params):
+        return [
+            {'blockNumber': block, 'args': {'key': key}}
+            for block, key in self.stored.items()
+            if filter_params['fromBlock'] <= block <= filter_params['toBlock']
+        ]
+
+
+def make_client(monkeypatch, **kwargs) -> tuple[FakeMap, MapClient]:
+    fake = FakeMap()
+    monkeypatch.setattr(map_client, 'get_map_contract', lambda w3, address: fake)
+    return fake, MapClient(fake, fake.address, poll_interval=0, **kwargs)
+
+
+def test_cached_value_is_not_read_again(monkeypatch) -> None:
+    fake, client = make_client(monkeypatch)
+    fake.store('key', 'value')
+    assert client.get('key') == 'value'
+    assert client.get('key') == 'value'
+    assert fake.calls == 1
+
+
+def test_stored_event_invalidates_key(monkeypatch) -> None:
+    fake, client = make_client(monkeypatch)
+    fake.store('key', 'old')
+    fake.store('other', 'value')
+    assert client.get('key') == 'old'
+    assert client.get('other') == 'value'
+
+    fake.store('key', 'new')
+    assert client.get('key') == 'new'
+    assert client.get('other') == 'value'
+    assert fake.calls == 3
+
+
+def test_least_recently_used_keys_are_evicted(monkeypatch) -> None:
+    fake, client = make_client(monkeypatch, max_size=2)
+    client.get('a')
+    client.get('b')
+    client.get('a')
+    client.get('c')
+    fake.calls = 0
+    client.get('a')
+    client.get('c')
+    assert fake.calls == 0
+    client.get('b')
+    assert fake.calls == 1
@@ -0,0 +1,24 @@
+from map_snapshot import MapSnapshot, write_snapshot
+
+
+def test_snapshot_roundtrip(tmp_path) -> None:
+    items = {f"key{i}": f"value {i}" for i in range(100)}
+    items["zażółć"] = "gęślą jaźń"
+    path = tmp_path / "map.snapshot"
+    write_snapshot(path, 1234, items)
+
+    with MapSnapshot(path) as snapshot:
+        assert snapshot.block_number == 1234
+        assert len(snapshot) == len(items)
+        assert all(snapshot.get(key) == value for key, value in items.items())
+        assert snapshot.get("missing") is None
+        assert snapshot.get("key") is None
+        assert dict(snapshot.items()) == items
+
+
+def test_empty_snapshot(tmp_path) -> None:
+    path = tmp_path / "map.snapshot"
+    write_snapshot(path, 1, {})
+    with MapSnapshot(path) as snapshot:
+        assert len(snapshot) == 0
+        assert snapshot.get("key") is None
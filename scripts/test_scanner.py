@@ -0,0 +1,147 @@
+import contextlib
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import scanner
+from scanner import AdaptiveBatchSize, ScanCursor, fetch_blocks_batched, fetch_raw_blocks
+
+
+class FakeBatch:
+    def __init__(self, eth, failures: list):
+        self.eth = eth
+        self.failures = failures
+        self.requests = []
+
+    def add(self, request) -> None:
+        self.requests.append(request)
+
+    def execute(self) -> list:
+        self.eth.batch_sizes.append(len(self.requests))
+        if self.failures and self.failures.pop(0):
+            raise ValueError("batch too large")
+        return self.requests
+
+
+class FakeEth:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def get_block(self, number, full_transactions=False):
+        return number
+
+
+def test_batch_size_grows_back_after_single_block_fetches(monkeypatch) -> None:
+    eth = FakeEth()
+    # the first batches fail until a single block is requested
+    failures = [True, True, True]
+    w3 = SimpleNamespace(eth=eth, batch_requests=lambda: contextlib.nullcontext(FakeBatch(eth, failures)))
+    monkeypatch.setattr(scanner, "_batching_web3", lambda w3: w3)
+    batch_size = AdaptiveBatchSize(8)
+
+    assert fetch_blocks_batched(w3, 0, 29, batch_size) == list(range(30))
+    assert eth.batch_sizes[:3] == [8, 4, 2]
+    assert eth.batch_sizes[3:6] == [2, 3, 4]
+
+
+class FailingRawProvider:
+    """Provider rejecting the first `failures` batches."""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.batch_sizes = []
+
+    def make_raw_request(self, method, params) -> bytes:
+        return b'{"jsonrpc": "2.0", "id": 0, "result": {}}'
+
+    def make_raw_batch_request(self, batch_requests) -> bytes:
+        self.batch_sizes.append(len(batch_requests))
+        if self.failures:
+            self.failures -= 1
+            return b'{"jsonrpc": "2.0", "id": null, "error": {"code": -32600, "message": "batch too large"}}'
+        return b'[' + b', '.join(b'{"jsonrpc": "2.0", "id": 0, "result": {}}' for _ in batch_requests) + b']'
+
+
+def test_raw_batch_size_grows_back_after_single_block_fetches() -> None:
+    provider = FailingRawProvider(failures=3)
+    responses = fetch_raw_blocks(SimpleNamespace(provider=provider), 0, 29, AdaptiveBatchSize(8))
+    assert provider.batch_sizes[:6] == [8, 4, 2, 2, 3, 4]
+    assert len(responses) < 30
+
+
+def test_log_range_grows_back_after_failures() -> None:
+    ranges = []
+
+    def get_logs(params):
+        ranges.append((params["fromBlock"], params["toBlock"]))
+        if len(ranges) <= 2:
+            raise ValueError("query returned more than 10000 results")
+        return [params["fromBlock"]]
+
+    w3 = SimpleNamespace(eth=SimpleNamespace(get_logs=get_logs))
+    logs = list(scanner.iter_logs(w3, "0x" + "11" * 20, [], 0, 29999, block_range=10000))
+    assert ranges == [
+        (0, 9999),
+        (0, 4999),
+        (0, 2499),
+        # the range doubles after every success, up to the initial range
+        (2500, 7499),
+        (7500, 17499),
+        (17500, 27499),
+        (27500, 29999),
+    ]
+    assert logs == [0, 2500, 7500, 17500, 27500]
+
+
+def test_cursor_resumes_after_last_scanned_block(tmp_path, chain) -> None:
+    path = tmp_path / "cursor.json"
+    cursor = ScanCursor(path, reorg_depth=20)
+    assert cursor.resume_block(chain) is None
+
+    for number in range(150, 201):
+        cursor.advance(chain.get_block(number))
+    # only blocks that may still be reorganized are kept
+    assert sorted(cursor.block_hashes) == list(range(181, 201))
+    cursor.save()
+
+    cursor = ScanCursor(path, reorg_depth=20)
+    assert cursor.last_block == 200
+    assert cursor.resume_block(chain) == 201
+    assert json.loads(path.read_text())["last_block"] == 200
+
+
+@pytest.mark.parametrize(
+    ("first_reorganized", "head", "resume_block"),
+    [
+        (190, None, 190),
+        # the chain got shorter
+        (201, 195, 196),
+        # deeper than the cursor can tell, the scan is rewound as far as possible
+        (100, None, 181),
+    ],
+)
+def test_cursor_rewinds_after_reorg(tmp_path, chain, first_reorganized, head, resume_block) -> None:
+    cursor = ScanCursor(tmp_path / "cursor.json", reorg_depth=20)
+    for number in range(150, 201):
+        cursor.advance(chain.get_block(number))
+
+    chain.reorganize(first_reorganized, head)
+    assert cursor.resume_block(chain) == resume_block
+    assert cursor.last_block == (resume_block - 1 if resume_block > 181 else None)
+
+
+def test_cursor_is_saved_atomically(tmp_path, chain, monkeypatch) -> None:
+    path = tmp_path / "cursor.json"
+    cursor = ScanCursor(path)
+    cursor.advance(chain.get_block(100))
+    cursor.save()
+
+    def fail(*args) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr(scanner.os, "replace", fail)
+    cursor.advance(chain.get_block(101))
+    with pytest.raises(OSError):
+        cursor.save()
+    assert ScanCursor(path).last_block == 100
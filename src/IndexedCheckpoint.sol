@@ -0,0 +1,33 @@
+// SPDX-License-Identifier: UNLICENSED
+pragma solidity ^0.8.28;
+
+/**
+ * @title IndexedCheckpoint
+ * @notice Checkpoint variant that emits an event on every call
+ * @dev Calls can be found with `eth_getLogs` instead of downloading and scanning every transaction of every block.
+ * The payload itself is not part of the event; it is read from the calldata of the transaction referenced by the log
+ * and can be verified against the emitted hash.
+ */
+contract IndexedCheckpoint {
+    uint256 public a;
+
+    /**
+     * @notice Emitted on every checkpoint call
+     * @param sender The address that called the checkpoint function
+     * @param selector The selector of the called checkpoint function
+     * @param payloadHash keccak256 of the checkpointed data
+     */
+    event Checkpointed(address indexed sender, bytes4 indexed selector, bytes32 payloadHash);
+
+    function checkpointBounded(bytes32 b) external {
+        // trigger change in blockchain's state
+        a = 42;
+        emit Checkpointed(msg.sender, msg.sig, keccak256(abi.encodePacked(b)));
+    }
+
+    function checkpointUnbounded(bytes calldata b) external {
+        // trigger change in blockchain's state
+        a = 42;
+        emit Checkpointed(msg.sender, msg.sig, keccak256(b));
+    }
+}
@@ -14,9 +14,24 @@ contract Map {
     /// @notice Mapping of string keys to string values
     mapping(string => string) public value;
 
+    /// @notice Keys with a non-empty value, in no particular order
+    string[] private _keys;
+
+    /// @notice Position of every key in `_keys`, plus one; zero for keys without a value
+    mapping(string => uint256) private _keyPositions;
+
+    /**
+     * @notice Emitted whenever the value of a key is stored or deleted
+     * @param key The key whose value changed
+     */
+    event Stored(string key);
+
     /// @notice Error thrown when a non-admin address tries to modify values
     error NotAdmin();
 
+    /// @notice Error thrown when the number of keys and values passed to `storeMany` differ
+    error LengthMismatch();
+
     /**
      * @notice Constructs the Map contract
      * @param admin The address that will have permission to modify values
@@ -35,10 +50,81 @@ contract Map {
     function store(string calldata key, string calldata newValue) external {
         if (msg.sender != ADMIN) revert NotAdmin();
 
+        _store(key, newValue);
+    }
+
+    /**
+     * @notice Stores or deletes values for multiple keys in a single transaction
+     * @dev Only the admin can call this function. Pairs are applied in order, so a later pair wins over an earlier
+     * one with the same key. Empty values delete their keys, as in `store`.
+     * @param keys The keys to store the values under
+     * @param newValues The values to store, one for each key
+     * @custom:throws NotAdmin if called by any address other than the admin
+     * @custom:throws LengthMismatch if the number of keys and values differ
+     */
+    function storeMany(string[] calldata keys, string[] calldata newValues) external {
+        if (msg.sender != ADMIN) revert NotAdmin();
+        if (keys.length != newValues.length) revert LengthMismatch();
+
+        for (uint256 i = 0; i < keys.length; i++) {
+            _store(keys[i], newValues[i]);
+        }
+    }
+
+    /**
+     * @notice Returns the number of keys with a value
+     */
+    function keyCount() external view returns (uint256) {
+        return _keys.length;
+    }
+
+    /**
+     * @notice Returns a page of the stored key-value pairs
+     * @dev Pairs are not ordered; deleting a key moves the last key into its position. To get a consistent view of
+     * the whole map, read all pages at the same block.
+     * @param offset Position of the first pair to return
+     * @param limit Maximum number of pairs to return
+     * @return pageKeys The keys of the page
+     * @return pageValues The values of the page, one for each key
+     */
+    function entries(uint256 offset, uint256 limit)
+        external
+        view
+        returns (string[] memory pageKeys, string[] memory pageValues)
+    {
+        uint256 count = _keys.length;
+        if (offset > count) offset = count;
+        if (limit > count - offset) limit = count - offset;
+
+        pageKeys = new string[](limit);
+        pageValues = new string[](limit);
+        for (uint256 i = 0; i < limit; i++) {
+            pageKeys[i] = _keys[offset + i];
+            pageValues[i] = value[pageKeys[i]];
+        }
+    }
+
+    function _store(string calldata key, string calldata newValue) internal {
+        uint256 position = _keyPositions[key];
         if (bytes(newValue).length == 0) {
             delete value[key];
+            if (position != 0) {
+                uint256 lastIndex = _keys.length - 1;
+                if (position - 1 != lastIndex) {
+                    string memory lastKey = _keys[lastIndex];
+                    _keys[position - 1] = lastKey;
+                    _keyPositions[lastKey] = position;
+                }
+                _keys.pop();
+                delete _keyPositions[key];
+            }
         } else {
             value[key] = newValue;
+            if (position == 0) {
+                _keys.push(key);
+                _keyPositions[key] = _keys.length;
+            }
         }
+        emit Stored(key);
     }
 }
@@ -0,0 +1,46 @@
+// SPDX-License-Identifier: UNLICENSED
+pragma solidity ^0.8.28;
+
+import {Test} from "forge-std/Test.sol";
+import {IndexedCheckpoint} from "../src/IndexedCheckpoint.sol";
+
+contract IndexedCheckpointTest is Test {
+    IndexedCheckpoint public checkpoint;
+    address public user = makeAddr("user");
+
+    event Checkpointed(address indexed sender, bytes4 indexed selector, bytes32 payloadHash);
+
+    function setUp() public {
+        checkpoint = new IndexedCheckpoint();
+    }
+
+    function test_CheckpointBoundedEmitsEvent() public {
+        bytes32 data = keccak256("data");
+
+        vm.expectEmit(true, true, false, true, address(checkpoint));
+        emit Checkpointed(user, IndexedCheckpoint.checkpointBounded.selector, keccak256(abi.encodePacked(data)));
+
+        vm.prank(user);
+        checkpoint.checkpointBounded(data);
+        assertEq(checkpoint.a(), 42);
+    }
+
+    function test_CheckpointUnboundedEmitsEvent() public {
+        bytes memory data = "some data that does not fit into a single word of storage";
+
+        vm.expectEmit(true, true, false, true, address(checkpoint));
+        emit Checkpointed(user, IndexedCheckpoint.checkpointUnbounded.selector, keccak256(data));
+
+        vm.prank(user);
+        checkpoint.checkpointUnbounded(data);
+        assertEq(checkpoint.a(), 42);
+    }
+
+    function test_CheckpointUnboundedEmptyPayload() public {
+        vm.expectEmit(true, true, false, true, address(checkpoint));
+        emit Checkpointed(user, IndexedCheckpoint.checkpointUnbounded.selector, keccak256(""));
+
+        vm.prank(user);
+        checkpoint.checkpointUnbounded("");
+    }
+}
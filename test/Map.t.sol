@@ -12,6 +12,8 @@ contract MapTest is Test {
     string constant TEST_KEY = "testKey";
     string constant TEST_VALUE = "testValue";
 
+    event Stored(string key);
+
     function setUp() public {
         vm.prank(admin);
         map = new Map(admin);
@@ -78,4 +80,174 @@ contract MapTest is Test {
         vm.prank(user);
         assertEq(map.value(TEST_KEY), TEST_VALUE);
     }
+
+    function _pairs() internal pure returns (string[] memory keys, string[] memory values) {
+        keys = new string[](3);
+        values = new string[](3);
+        keys[0] = "key0";
+        values[0] = "value0";
+        keys[1] = "key1";
+        values[1] = "value1";
+        keys[2] = "key2";
+        values[2] = "a value that is longer than thirty two bytes, so it spans multiple slots";
+    }
+
+    function test_AdminCanStoreMany() public {
+        (string[] memory keys, string[] memory values) = _pairs();
+
+        vm.prank(admin);
+        map.storeMany(keys, values);
+
+        for (uint256 i = 0; i < keys.length; i++) {
+            assertEq(map.value(keys[i]), values[i]);
+        }
+    }
+
+    function test_StoreManyDeletesEmptyValues() public {
+        (string[] memory keys, string[] memory values) = _pairs();
+        vm.prank(admin);
+        map.storeMany(keys, values);
+
+        values[1] = "";
+        vm.prank(admin);
+        map.storeMany(keys, values);
+
+        assertEq(map.value(keys[0]), values[0]);
+        assertEq(map.value(keys[1]), "");
+        assertEq(map.value(keys[2]), values[2]);
+    }
+
+    function test_StoreManyLastValueWins() public {
+        string[] memory keys = new string[](2);
+        string[] memory values = new string[](2);
+        keys[0] = TEST_KEY;
+        values[0] = "first";
+        keys[1] = TEST_KEY;
+        values[1] = "second";
+
+        vm.prank(admin);
+        map.storeMany(keys, values);
+        assertEq(map.value(TEST_KEY), "second");
+    }
+
+    function test_revert_StoreManyLengthMismatch() public {
+        (string[] memory keys,) = _pairs();
+        string[] memory values = new string[](2);
+
+        vm.prank(admin);
+        vm.expectRevert(Map.LengthMismatch.selector);
+        map.storeMany(keys, values);
+    }
+
+    function test_revert_NonAdminCannotStoreMany() public {
+        (string[] memory keys, string[] memory values) = _pairs();
+
+        vm.prank(user);
+        vm.expectRevert(Map.NotAdmin.selector);
+        map.storeMany(keys, values);
+    }
+
+    function test_StoreEmitsStored() public {
+        vm.expectEmit(false, false, false, true, address(map));
+        emit Stored(TEST_KEY);
+
+        vm.prank(admin);
+        map.store(TEST_KEY, TEST_VALUE);
+    }
+
+    function test_DeleteEmitsStored() public {
+        vm.prank(admin);
+        map.store(TEST_KEY, TEST_VALUE);
+
+        vm.expectEmit(false, false, false, true, address(map));
+        emit Stored(TEST_KEY);
+
+        vm.prank(admin);
+        map.store(TEST_KEY, "");
+    }
+
+    function test_StoreManyEmitsStoredForEveryKey() public {
+        (string[] memory keys, string[] memory values) = _pairs();
+
+        for (uint256 i = 0; i < keys.length; i++) {
+            vm.expectEmit(false, false, false, true, address(map));
+            emit Stored(keys[i]);
+        }
+
+        vm.prank(admin);
+        map.storeMany(keys, values);
+    }
+
+    function test_KeysAreEnumerated() public {
+        (string[] memory keys, string[] memory values) = _pairs();
+        vm.prank(admin);
+        map.storeMany(keys, values);
+
+        assertEq(map.keyCount(), 3);
+        (string[] memory pageKeys, string[] memory pageValues) = map.entries(0, 10);
+        assertEq(pageKeys.length, 3);
+        for (uint256 i = 0; i < keys.length; i++) {
+            assertEq(pageKeys[i], keys[i]);
+            assertEq(pageValues[i], values[i]);
+        }
+    }
+
+    function test_UpdateDoesNotDuplicateKey() public {
+        vm.prank(admin);
+        map.store(TEST_KEY, "initialValue");
+        vm.prank(admin);
+        map.store(TEST_KEY, "updatedValue");
+
+        assertEq(map.keyCount(), 1);
+        (string[] memory pageKeys, string[] memory pageValues) = map.entries(0, 10);
+        assertEq(pageKeys[0], TEST_KEY);
+        assertEq(pageValues[0], "updatedValue");
+    }
+
+    function test_DeleteRemovesKeyFromEnumeration() public {
+        (string[] memory keys, string[] memory values) = _pairs();
+        vm.prank(admin);
+        map.storeMany(keys, values);
+
+        vm.prank(admin);
+        map.store(keys[0], "");
+        assertEq(map.keyCount(), 2);
+
+        // the last key takes the position of the deleted one
+        (string[] memory pageKeys,) = map.entries(0, 10);
+        assertEq(pageKeys[0], keys[2]);
+        assertEq(pageKeys[1], keys[1]);
+
+        // deleting the rest, including a key that is not set, leaves nothing behind
+        vm.prank(admin);
+        map.store(keys[2], "");
+        vm.prank(admin);
+        map.store("missing", "");
+        vm.prank(admin);
+        map.store(keys[1], "");
+        assertEq(map.keyCount(), 0);
+
+        vm.prank(admin);
+        map.store(keys[1], values[1]);
+        assertEq(map.keyCount(), 1);
+    }
+
+    function test_EntriesArePaginated() public {
+        (string[] memory keys, string[] memory values) = _pairs();
+        vm.prank(admin);
+        map.storeMany(keys, values);
+
+        (string[] memory pageKeys, string[] memory pageValues) = map.entries(1, 1);
+        assertEq(pageKeys.length, 1);
+        assertEq(pageKeys[0], keys[1]);
+        assertEq(pageValues[0], values[1]);
+
+        (pageKeys,) = map.entries(2, type(uint256).max);
+        assertEq(pageKeys.length, 1);
+        assertEq(pageKeys[0], keys[2]);
+
+        (pageKeys, pageValues) = map.entries(5, 10);
+        assertEq(pageKeys.length, 0);
+        assertEq(pageValues.length, 0);
+    }
 }